@@ -9,10 +9,12 @@ __email__ = "segene2001@github"
 from .threat_collector import ThreatCollector
 from .threat_analyzer import ThreatAnalyzer
 from .sector_analyzers import FinancialServicesAnalyzer, AgricultureAnalyzer
+from .ioc_index import IOCIndex
 
 __all__ = [
     'ThreatCollector',
     'ThreatAnalyzer',
     'FinancialServicesAnalyzer',
-    'AgricultureAnalyzer'
+    'AgricultureAnalyzer',
+    'IOCIndex'
 ]
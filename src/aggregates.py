@@ -0,0 +1,138 @@
+"""
+Threat Aggregates
+Single-pass, mergeable counters and averages for reports and dashboards
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, Mapping
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Counted for threats whose severity or threat type is missing or null
+DEFAULT_SEVERITY = 'medium'
+DEFAULT_THREAT_TYPE = 'unknown'
+
+
+class ThreatAggregate:
+    """Every report statistic over a stream of analyzed threats
+    
+    ``update`` reads each threat once; aggregates built over separate chunks,
+    processes or storage queries combine with ``merge`` (or ``+``), so
+    reports over large corpora never need the threats in memory together.
+    """
+    
+    def __init__(self):
+        """Initialize empty aggregate"""
+        self.total = 0
+        self.risk_total = 0.0
+        self.priorities = Counter()
+        self.sectors = Counter()
+        self.types = Counter()
+        self.severities = Counter()
+        # framework -> [affected threats, threats requiring regulatory reporting]
+        self.compliance = {}
+    
+    @classmethod
+    def from_threats(cls, threats: Iterable[Mapping]) -> 'ThreatAggregate':
+        """Aggregate an iterable of threats in one pass"""
+        return cls().update(threats)
+    
+    def add(self, threat: Mapping):
+        """Count one threat"""
+        self.update((threat,))
+    
+    def update(self, threats: Iterable[Mapping]) -> 'ThreatAggregate':
+        """Count every threat of an iterable; returns ``self``
+        
+        Threats are first tallied by their combination of counted fields,
+        which repeats heavily across a corpus, and each combination is then
+        folded into the counters once.
+        """
+        combinations = {}
+        # (framework, reporting flag) tuples, one per distinct impact content,
+        # so memory grows with the few distinct impacts rather than the threats
+        impacts = {}
+        risk_total = 0
+        
+        for threat in threats:
+            props = threat.get('custom_properties', {})
+            analysis = threat.get('analysis', {})
+            risk_total += analysis.get('risk_score', 0)
+            
+            compliance = ()
+            fs_analysis = threat.get('financial_services_analysis')
+            if fs_analysis:
+                impact = fs_analysis.get('compliance_impact')
+                if impact:
+                    compliance = tuple(
+                        (framework, bool(details.get('reporting_required')))
+                        for framework, details in impact.items()
+                    )
+                    compliance = impacts.setdefault(compliance, compliance)
+            
+            threat_type = props.get('threat_type')
+            severity = props.get('severity')
+            key = (analysis.get('priority'), tuple(props.get('sectors') or ()),
+                   DEFAULT_THREAT_TYPE if threat_type is None else threat_type,
+                   DEFAULT_SEVERITY if severity is None else severity, compliance)
+            combinations[key] = combinations.get(key, 0) + 1
+        
+        self.risk_total += risk_total
+        for (priority, sectors, threat_type, severity, compliance), n in combinations.items():
+            self.total += n
+            if priority is not None:
+                self.priorities[priority] += n
+            for sector in sectors:
+                self.sectors[sector] += n
+            self.types[threat_type] += n
+            self.severities[severity] += n
+            for framework, reporting_required in compliance:
+                counts = self.compliance.setdefault(framework, [0, 0])
+                counts[0] += n
+                if reporting_required:
+                    counts[1] += n
+        return self
+
+    def merge(self, other: 'ThreatAggregate') -> 'ThreatAggregate':
+        """Fold another aggregate into this one; returns ``self``"""
+        self.total += other.total
+        self.risk_total += other.risk_total
+        self.priorities.update(other.priorities)
+        self.sectors.update(other.sectors)
+        self.types.update(other.types)
+        self.severities.update(other.severities)
+        for framework, (affected, reporting) in other.compliance.items():
+            counts = self.compliance.setdefault(framework, [0, 0])
+            counts[0] += affected
+            counts[1] += reporting
+        return self
+    
+    def __add__(self, other: 'ThreatAggregate') -> 'ThreatAggregate':
+        return ThreatAggregate().merge(self).merge(other)
+    
+    @property
+    def average_risk_score(self) -> float:
+        """Mean risk score, counting unanalyzed threats as 0"""
+        return self.risk_total / self.total if self.total else 0.0
+    
+    def compliance_summary(self, frameworks: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """Affected and action-required counts per framework"""
+        summary = {}
+        for framework in frameworks:
+            affected, reporting = self.compliance.get(framework, (0, 0))
+            summary[framework] = {'affected_threats': affected, 'requires_action': reporting}
+        return summary
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Counters and distributions as plain JSON-serializable values"""
+        return {
+            'total_threats': self.total,
+            'average_risk_score': round(self.average_risk_score, 2),
+            'priority_distribution': dict(self.priorities),
+            'sector_distribution': dict(self.sectors),
+            'type_distribution': dict(self.types),
+            'severity_distribution': dict(self.severities),
+            'compliance_summary': self.compliance_summary(sorted(self.compliance))
+        }
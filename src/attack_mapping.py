@@ -0,0 +1,143 @@
+"""
+MITRE ATT&CK Technique Mapping
+Prefix trie resolving technique IDs to parent techniques, tactics and attack vectors
+"""
+
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import yaml
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPING_PATH = 'config/attack_mapping.yaml'
+
+# Used when no mapping file is available; matches the analyzer's original rules
+DEFAULT_TECHNIQUES = {
+    'T1078': {'tactics': ['initial-access', 'persistence', 'privilege-escalation', 'defense-evasion'],
+              'vectors': ['valid_accounts']},
+    'T1110': {'tactics': ['credential-access'], 'vectors': ['brute_force']},
+    'T1190': {'tactics': ['initial-access'], 'vectors': ['exploit_public_facing']},
+    'T1200': {'tactics': ['initial-access'], 'vectors': ['hardware_additions']},
+    'T1486': {'tactics': ['impact'], 'categories': ['ransomware']},
+    'T1498': {'tactics': ['impact']},
+    'T1566': {'tactics': ['initial-access'], 'vectors': ['phishing']}
+}
+
+
+class Technique(NamedTuple):
+    """What a technique ID resolves to"""
+    technique_id: str             # Most specific known technique, e.g. 'T1566.001'
+    lineage: Tuple[str, ...]      # Known techniques from most to least specific
+    tactics: Tuple[str, ...]
+    vectors: Tuple[str, ...]
+    categories: Tuple[str, ...]
+
+
+_UNKNOWN = Technique('', (), (), (), ())
+
+
+class _Node:
+    """Trie node for one technique ID segment"""
+    __slots__ = ('children', 'technique')
+    
+    def __init__(self):
+        self.children = {}
+        self.technique = None
+
+
+class TechniqueTrie:
+    """Technique lookup keyed on dotted ID segments
+    
+    ``T1566.001`` walks ``T1566`` then ``001``; the deepest known node wins
+    and sub-techniques inherit tactics, vectors and categories they do not
+    set themselves. Unknown sub-techniques resolve to their parent, so
+    feeds reporting ``T1566.001`` match rules written for ``T1566``.
+    """
+    
+    def __init__(self, techniques: Dict[str, Dict] = None):
+        """Initialize trie from ``{technique id: {tactics, vectors, categories}}``"""
+        self.root = _Node()
+        self._cache = {}
+        
+        # Parents first, so sub-techniques can inherit from them
+        for technique_id in sorted(techniques or {}, key=lambda t: t.count('.')):
+            self.add(technique_id, techniques[technique_id] or {})
+    
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_MAPPING_PATH) -> 'TechniqueTrie':
+        """Load a mapping file, falling back to the built-in mapping"""
+        try:
+            with open(path, 'r') as f:
+                mapping = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            logger.warning(f"ATT&CK mapping not found: {path}. Using defaults.")
+            mapping = {'techniques': DEFAULT_TECHNIQUES}
+        
+        return cls(mapping.get('techniques', {}))
+    
+    def add(self, technique_id: str, attributes: Dict):
+        """Add or replace one technique"""
+        technique_id = technique_id.strip().upper()
+        segments = technique_id.split('.')
+        
+        node = self.root
+        inherited = _UNKNOWN
+        for segment in segments[:-1]:
+            node = node.children.setdefault(segment, _Node())
+            if node.technique is not None:
+                inherited = node.technique
+        node = node.children.setdefault(segments[-1], _Node())
+        
+        node.technique = Technique(
+            technique_id=technique_id,
+            lineage=(technique_id,) + inherited.lineage,
+            tactics=tuple(attributes.get('tactics', inherited.tactics)),
+            vectors=tuple(attributes.get('vectors', inherited.vectors)),
+            categories=tuple(attributes.get('categories', inherited.categories))
+        )
+        self._cache.clear()
+    
+    def resolve(self, ttp: str) -> Technique:
+        """Resolve a TTP to its most specific known technique"""
+        technique = self._cache.get(ttp)
+        if technique is not None:
+            return technique
+        
+        node = self.root
+        technique = _UNKNOWN
+        for segment in str(ttp).strip().upper().split('.'):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.technique is not None:
+                technique = node.technique
+        
+        self._cache[ttp] = technique
+        return technique
+    
+    def vectors(self, ttps: Iterable[str]) -> List[str]:
+        """Attack vectors of each TTP, in TTP order"""
+        return [vector for ttp in ttps for vector in self.resolve(ttp).vectors]
+    
+    def has_category(self, ttps: Iterable[str], category: str) -> bool:
+        """Whether any TTP resolves to a technique in ``category``"""
+        return any(category in self.resolve(ttp).categories for ttp in ttps)
+    
+    def matches_any(self, ttps: Iterable[str], technique_ids: Iterable[str]) -> bool:
+        """Whether any TTP is, or is a sub-technique of, one of ``technique_ids``"""
+        for ttp in ttps:
+            if ttp in technique_ids:
+                return True
+            if any(parent in technique_ids for parent in self.resolve(ttp).lineage):
+                return True
+        return False
+
+
+@lru_cache(maxsize=None)
+def load_attack_mapping(path: str = DEFAULT_MAPPING_PATH) -> TechniqueTrie:
+    """Return the shared trie for a mapping file, loading it once per process"""
+    return TechniqueTrie.from_file(path)
+
@@ -0,0 +1,376 @@
+"""
+Threat Intelligence Daemon
+Resident scheduler running collection, analysis and the dashboard every interval
+"""
+
+import logging
+import random
+import signal
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from .threat_collector import AsyncThreatCollector, _to_utc
+    from .threat_analyzer import ThreatAnalyzer
+    from .sector_analyzers import FinancialServicesAnalyzer, AgricultureAnalyzer
+    from .dashboard import ThreatDashboard, DashboardServer
+    from .threat_io import append_threats, iter_threat_file, write_threats
+    from .metrics import metrics
+except ImportError:
+    from threat_collector import AsyncThreatCollector, _to_utc
+    from threat_analyzer import ThreatAnalyzer
+    from sector_analyzers import FinancialServicesAnalyzer, AgricultureAnalyzer
+    from dashboard import ThreatDashboard, DashboardServer
+    from threat_io import append_threats, iter_threat_file, write_threats
+    from metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The analysis file is rewritten once the pending journal holds this share
+# of the corpus, so rewrites cost O(1) amortized per new threat
+COMPACT_RATIO = 0.25
+# ... and at least this often, to drop threats past retention
+COMPACT_INTERVAL = 86400.0
+
+
+class ThreatDaemon:
+    """Runs collect -> analyze -> sector-analyze -> dashboard on a schedule
+    
+    Everything expensive to set up is created once and kept between
+    cycles: the config, feed cursors, dedup index and pooled HTTP sessions
+    (collector), keyword automaton, ATT&CK trie and template caches
+    (analyzers), the analysis cache, the storage connection, the analyzed
+    corpus and the dashboard's statistics and rendered cards. Each cycle
+    only collects records newer than the feed cursors, then runs the whole
+    corpus through incremental analysis: new threats are analyzed, aged
+    ones whose recency bucket changed are re-scored, and the rest keep
+    their cached analysis. Only threats whose analysis changed are written.
+    
+    With storage configured, the database holds the corpus. Otherwise it
+    is kept in memory; each cycle appends its analyses to a pending NDJSON
+    journal beside the analysis file, which is folded into the analysis
+    file (dropping threats past retention) once it has grown to
+    ``COMPACT_RATIO`` of the corpus, daily, and on shutdown.
+    """
+    
+    def __init__(self, config_path: str = 'config/config.yaml',
+                 analysis_path: str = 'data/analyzed_threats.json',
+                 dashboard_path: str = 'dashboard.html',
+                 workers: int = None):
+        """Initialize daemon and warm its state from the previous analysis"""
+        self.collector = AsyncThreatCollector(config_path)
+        self.config = self.collector.config
+        self.storage = self.collector.storage
+        self.analysis_path = analysis_path
+        self.dashboard_path = dashboard_path
+        self.workers = workers
+        
+        metrics.configure(self.config)
+        self.metrics_report_path = self.config.get('metrics', {}).get('report_path')
+        
+        collection_config = self.config.get('collection', {})
+        self.interval_seconds = collection_config.get('interval_hours', 1) * 3600
+        self.jitter_seconds = collection_config.get('jitter_minutes', 5) * 60
+        retention_days = self.config.get('storage', {}).get('retention_days', 365)
+        self.retention = timedelta(days=retention_days)
+        
+        sectors_config = self.config.get('sectors', {})
+        fs_config = sectors_config.get('financial_services', {})
+        self.institution_type = (fs_config.get('institution_types') or ['credit_union'])[0]
+        self.compliance_frameworks = fs_config.get('compliance_frameworks', ['FFIEC', 'FCA'])
+        self.focus_areas = sectors_config.get('agriculture', {}).get(
+            'focus_areas', ['supply_chain', 'iot_devices', 'rural_infrastructure']
+        )
+        
+        self.analyzer = ThreatAnalyzer()
+        self.fs_analyzer = FinancialServicesAnalyzer()
+        self.ag_analyzer = AgricultureAnalyzer()
+        
+        # Analyzed corpus by threat id (without storage), and its pending journal
+        self.threats: Dict[str, Dict] = {}
+        self.pending_path = f"{analysis_path}.pending.ndjson" if analysis_path else None
+        self._pending = 0
+        self._compacted_at = time.monotonic()
+        
+        if self.storage is not None:
+            self.analyzer.seed_analysis_cache(self.storage.iter_threats(), sector='financial_services')
+            self.dashboard = ThreatDashboard(storage=self.storage)
+        else:
+            self._warm_start()
+            self.analyzer.seed_analysis_cache(self.threats.values(), sector='financial_services')
+            # Fed from the in-memory corpus rather than reading the file again
+            self.dashboard = ThreatDashboard('')
+            self.dashboard.update_threats(list(self.threats.values()))
+        self.server: Optional[DashboardServer] = None
+        
+        self._stopping = threading.Event()
+        self._cycle_lock = threading.Lock()
+    
+    def _warm_start(self):
+        """Load the corpus analyzed before the last shutdown, then its pending journal"""
+        if not self.analysis_path:
+            return
+        
+        try:
+            for threat in iter_threat_file(self.analysis_path):
+                self.threats[threat['id']] = threat
+        except FileNotFoundError:
+            pass
+        
+        try:
+            for threat in iter_threat_file(self.pending_path):
+                self.threats[threat['id']] = threat
+                self._pending += 1
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            # A crash mid-append leaves a partial last line
+            logger.warning(f"Stopped reading {self.pending_path} at a damaged record: {e}")
+        
+        logger.info(f"Loaded {len(self.threats)} previously analyzed threats")
+    
+    def serve(self, host: str = '127.0.0.1', port: int = 8000):
+        """Serve the live dashboard from a background thread
+        
+        Critical and high threats are pushed to ``/api/events`` as soon as a
+        cycle analyzes them.
+        """
+        self.server = DashboardServer((host, port), self.dashboard)
+        self.analyzer.add_listener(self.server.announce)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"Serving dashboard on http://{host}:{self.server.server_port}/")
+    
+    def run_cycle(self) -> bool:
+        """Run one collection cycle; returns False if one was already running"""
+        if not self._cycle_lock.acquire(blocking=False):
+            logger.warning("Previous cycle still running; skipping this one")
+            metrics.count('daemon.cycles_skipped')
+            return False
+        
+        metrics.start_run()
+        try:
+            started = time.monotonic()
+            
+            with metrics.timer('daemon.cycle') as timer:
+                new_threats = self.collector.collect_all()
+                changed = self._analyze(new_threats)
+                self._publish(changed)
+                self.collector.commit_fingerprints()
+                timer.items = len(new_threats)
+            
+            logger.info(f"Cycle finished in {time.monotonic() - started:.1f}s; "
+                        f"{len(new_threats)} new threats, {len(changed)} analyses changed")
+        except Exception as e:
+            logger.error(f"Cycle failed: {e}")
+            metrics.count('daemon.cycles_failed')
+        finally:
+            self._cycle_lock.release()
+        
+        if metrics.enabled and self.metrics_report_path:
+            metrics.write_report(self.metrics_report_path)
+        return True
+    
+    def _corpus(self) -> Dict[str, Dict]:
+        """The analyzed corpus by threat id"""
+        if self.storage is not None:
+            return {threat['id']: threat for threat in self.storage.iter_threats()}
+        return dict(self.threats)
+    
+    def _analyze(self, new_threats: List[Dict]) -> List[Dict]:
+        """Re-analyze the corpus with the new threats; returns the threats whose analysis changed
+        
+        Risk scores age with recency, so the whole corpus goes through
+        incremental analysis every cycle. Sector analyses, which depend on
+        the risk score, are redone only for the changed threats.
+        """
+        corpus = self._corpus()
+        for threat in new_threats:
+            corpus[threat['id']] = threat
+        
+        # Cached analyses are reused as the same objects; anything else is new
+        previous = {threat_id: entry[2] for threat_id, entry in self.analyzer.analysis_cache.items()}
+        analyzed = self.analyzer.analyze(list(corpus.values()), sector='financial_services',
+                                         workers=self.workers, incremental=True)
+        combined = {
+            t['id']: t for t in analyzed.unordered()
+            if t['analysis'] is not previous.get(t['id'])
+        }
+        if not combined:
+            return []
+        
+        fs_threats = self.fs_analyzer.analyze_threats(
+            list(combined.values()),
+            institution_type=self.institution_type,
+            compliance_frameworks=self.compliance_frameworks,
+            workers=self.workers
+        )
+        for threat in fs_threats.unordered():
+            combined[threat['id']] = threat
+        
+        ag_threats = self.ag_analyzer.analyze_threats(
+            list(combined.values()), focus_areas=self.focus_areas, workers=self.workers
+        )
+        for threat in ag_threats:
+            combined[threat['id']] = threat
+        
+        return list(combined.values())
+    
+    def _publish(self, analyzed: List[Dict]):
+        """Merge changed analyses into the corpus and refresh storage, files and dashboard"""
+        if self.storage is not None:
+            if analyzed:
+                self.storage.upsert_many(analyzed)
+            self.storage.prune()
+            if not self.dashboard.reload_if_changed():
+                return
+        else:
+            if not analyzed and not self._compaction_due():
+                return
+            
+            # Replaced or expired threats need the dashboard statistics recomputed
+            recompute = any(threat['id'] in self.threats for threat in analyzed)
+            for threat in analyzed:
+                self.threats[threat['id']] = threat
+            
+            if self.pending_path and analyzed:
+                self._pending += append_threats(self.pending_path, analyzed)
+            if self._compaction_due() and self._compact():
+                recompute = True
+            
+            self.dashboard.update_threats(list(self.threats.values()),
+                                          added=None if recompute else analyzed)
+        
+        if self.dashboard_path:
+            self.dashboard.generate_html(self.dashboard_path)
+    
+    def _compaction_due(self) -> bool:
+        """Whether the pending journal should be folded into the analysis file"""
+        return (self._pending > COMPACT_RATIO * len(self.threats)
+                or time.monotonic() - self._compacted_at >= COMPACT_INTERVAL)
+    
+    def _compact(self) -> bool:
+        """Drop expired threats and rewrite the analysis file; returns whether any expired"""
+        cutoff = datetime.now(timezone.utc) - self.retention
+        expired = [tid for tid, t in self.threats.items() if _created_before(t, cutoff)]
+        for threat_id in expired:
+            del self.threats[threat_id]
+        
+        if self.analysis_path:
+            write_threats(self.analysis_path, self.threats.values())
+            Path(self.pending_path).unlink(missing_ok=True)
+            logger.info(f"Compacted {self._pending} pending analyses into {self.analysis_path}")
+        
+        self._pending = 0
+        self._compacted_at = time.monotonic()
+        return bool(expired)
+    
+    def _next_delay(self) -> float:
+        """Seconds until the next cycle, spread by up to ``jitter_minutes``"""
+        return self.interval_seconds + random.uniform(0, self.jitter_seconds)
+    
+    def run_forever(self):
+        """Run cycles every interval until ``stop`` is called or a signal arrives
+        
+        A cycle that overruns its interval skips the missed slot rather than
+        starting the next cycle straight after it. SIGINT and SIGTERM let the
+        running cycle finish before shutting down.
+        """
+        self._install_signal_handlers()
+        logger.info(f"Daemon started; collecting every {self.interval_seconds / 3600:g} hours")
+        
+        try:
+            next_run = time.monotonic()
+            while not self._stopping.is_set():
+                self.run_cycle()
+                
+                next_run += self._next_delay()
+                now = time.monotonic()
+                if next_run < now:
+                    logger.warning("Cycle overran its interval; skipping the missed run")
+                    next_run = now + self._next_delay()
+                self._stopping.wait(next_run - now)
+        finally:
+            self.close()
+    
+    def stop(self):
+        """Ask the daemon to stop after the current cycle"""
+        self._stopping.set()
+    
+    def _install_signal_handlers(self):
+        """Stop gracefully on SIGINT and SIGTERM (main thread only)"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        
+        def handle(signum, frame):
+            logger.info(f"Received signal {signum}; stopping after the current cycle")
+            self.stop()
+        
+        signal.signal(signal.SIGINT, handle)
+        signal.signal(signal.SIGTERM, handle)
+    
+    def close(self):
+        """Flush pending analyses, then release the server, HTTP sessions, dedup index and storage"""
+        if self._pending:
+            self._compact()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.collector.close()
+        if self.collector.dedup_index is not None:
+            self.collector.dedup_index.close()
+        if self.storage is not None:
+            self.storage.close()
+        logger.info("Daemon stopped")
+
+
+def _created_before(threat: Dict, cutoff: datetime) -> bool:
+    """Whether a threat was created before an aware ``cutoff``; undated threats never are"""
+    try:
+        created = datetime.fromisoformat(threat.get('created', '').replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return False
+    return _to_utc(created) < cutoff
+
+
+def main():
+    """Main execution function"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Run the threat intelligence pipeline on a schedule')
+    parser.add_argument('--config', default='config/config.yaml', help='Path to configuration file')
+    parser.add_argument('--output', default='data/analyzed_threats.json',
+                        help="Analyzed threats file (.json, .ndjson, optionally .gz/.zst); '' to skip")
+    parser.add_argument('--dashboard', default='dashboard.html', help='Dashboard file to keep up to date')
+    parser.add_argument('--workers', type=int, help='Processes for analyzing large batches')
+    parser.add_argument('--serve', action='store_true', help='Also serve the live dashboard')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to serve on')
+    parser.add_argument('--port', type=int, default=8000, help='Port to serve on')
+    parser.add_argument('--once', action='store_true', help='Run a single cycle and exit')
+    parser.add_argument('--metrics-report',
+                        help='Enable metrics and write a JSON run report here after every cycle')
+    args = parser.parse_args()
+    
+    daemon = ThreatDaemon(args.config, analysis_path=args.output,
+                          dashboard_path=args.dashboard, workers=args.workers)
+    if args.metrics_report:
+        metrics.enabled = True
+        daemon.metrics_report_path = args.metrics_report
+    
+    if args.once:
+        try:
+            daemon.run_cycle()
+        finally:
+            daemon.close()
+        return
+    
+    if args.serve:
+        daemon.serve(args.host, args.port)
+    daemon.run_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,41 +3,233 @@ Threat Intelligence Dashboard
 Simple web-based dashboard for visualizing threat intelligence
 """
 
+import gzip
+import hashlib
+import html
 import json
 import logging
+import os
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 import urllib.parse
 
+try:
+    from .threat_storage import ThreatStorage
+    from .ranking import RankedView, top_k
+    from .aggregates import ThreatAggregate
+    from .threat_io import read_threats
+    from .threat_record import to_json
+    from .events import ALERT_PRIORITIES, EventBroker
+    from .metrics import metrics
+except ImportError:
+    from threat_storage import ThreatStorage
+    from ranking import RankedView, top_k
+    from aggregates import ThreatAggregate
+    from threat_io import read_threats
+    from threat_record import to_json
+    from events import ALERT_PRIORITIES, EventBroker
+    from metrics import metrics
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Rendered responses kept per data version, so polling never re-renders
+RESPONSE_CACHE_SIZE = 256
+# Smaller bodies are sent uncompressed
+GZIP_MIN_SIZE = 1024
+
+# Seconds between data version checks that push new alerts to event streams
+WATCH_INTERVAL = 2.0
+# Idle event streams get a comment this often, so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15.0
+# A stream write blocked this long means the client stopped reading
+SSE_WRITE_TIMEOUT = 30.0
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Digest of the displayed content, written near the top of generated pages
+_CONTENT_DIGEST = re.compile(r'<meta name="content-digest" content="([0-9a-f]+)">')
+
+
+def _risk_score(threat: Dict) -> float:
+    """Ranking key: a threat's analyzed risk score"""
+    return threat.get('analysis', {}).get('risk_score', 0)
+
+
+def _matches(threat: Dict, sector: str = None, priority: str = None, source: str = None) -> bool:
+    """Whether a threat passes the API filters (same meaning as ThreatStorage's)"""
+    if sector and sector not in threat.get('custom_properties', {}).get('sectors', []):
+        return False
+    if priority and threat.get('analysis', {}).get('priority') != priority:
+        return False
+    if source and (threat.get('external_references') or [{}])[0].get('source_name') != source:
+        return False
+    return True
+
+
+def _analysis_digest(analysis: Dict) -> str:
+    """Hash of a threat's analysis, ignoring when it was produced"""
+    content = {key: value for key, value in analysis.items() if key != 'analyzed_at'}
+    return hashlib.blake2b(
+        json.dumps(content, sort_keys=True, default=to_json).encode('utf-8'), digest_size=16
+    ).hexdigest()
+
+
+def _written_digest(path: str) -> Optional[str]:
+    """Content digest of a previously generated dashboard, if any"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            head = f.read(1024)
+    except FileNotFoundError:
+        return None
+    
+    match = _CONTENT_DIGEST.search(head)
+    return match.group(1) if match else None
+
 
 class ThreatDashboard:
     """Generate HTML dashboard for threat intelligence"""
     
-    def __init__(self, threats_file: str = 'data/analyzed_threats.json'):
-        """Initialize dashboard"""
+    def __init__(self, threats_file: str = 'data/analyzed_threats.json',
+                 storage: ThreatStorage = None, display_limit: int = 20):
+        """Initialize dashboard
+        
+        With ``storage``, only the top ``display_limit`` threats are loaded
+        and the statistics are computed by the database.
+        """
         self.threats_file = threats_file
+        self.storage = storage
+        self.display_limit = display_limit
+        # Guards the threats and every cache derived from them; updates and
+        # renders can come from a collection thread and server threads at once
+        self._lock = threading.RLock()
+        self._version = self.data_version()
         self.threats = self._load_threats()
+        # Incremented whenever the threats change, so servers know to re-render
+        self.generation = 0
+        self._ranked = None
+        # Statistics and displayed threats of a file-backed dashboard, kept
+        # up to date by ``update_threats`` when threats are only added
+        self._aggregate: Optional[ThreatAggregate] = None
+        self._top: Optional[List[Dict]] = None
+        # threat id -> ((modified, analysis digest), rendered card) for the displayed threats
+        self._fragments = {}
+    
+    def data_version(self) -> Optional[Tuple]:
+        """Token that changes whenever the dashboard's threats change
+        
+        The threats file's modification time and size, or the storage's
+        ``data_version``; ``None`` while the file does not exist.
+        """
+        if self.storage is not None:
+            return self.storage.data_version()
+        
+        try:
+            stat = os.stat(self.threats_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def update_threats(self, threats: List[Dict], added: List[Dict] = None):
+        """Replace the threats with ones already in memory
+        
+        For a process that has just written the threats file, so the
+        dashboard does not read it back; ``generation`` still moves. When the
+        only change is ``added`` (new threats, none replacing an existing
+        one), the statistics and displayed threats are updated from those alone.
+        """
+        with self._lock:
+            self.threats = threats
+            self._ranked = None
+            if added is not None and self._aggregate is not None and self._top is not None:
+                self._aggregate.update(added)
+                self._top = top_k(self._top + list(added), self.display_limit, key=_risk_score)
+            else:
+                self._aggregate = None
+                self._top = None
+            self._version = self.data_version()
+            self.generation += 1
+    
+    def reload_if_changed(self) -> bool:
+        """Reload the threats if their data version moved; returns whether they changed"""
+        with self._lock:
+            version = self.data_version()
+            if version == self._version:
+                return False
+            
+            self._version = version
+            self.threats = self._load_threats()
+            self._ranked = None
+            self._aggregate = None
+            self._top = None
+            self.generation += 1
+            logger.info(f"Reloaded {len(self.threats)} threats")
+            return True
     
     def _load_threats(self):
-        """Load analyzed threats from file"""
+        """Load analyzed threats from storage or file"""
+        if self.storage is not None:
+            return self.storage.query(order_by='risk_score', limit=self.display_limit)
+        if not self.threats_file:
+            return []
+        
         try:
-            with open(self.threats_file, 'r') as f:
-                return json.load(f)
+            return read_threats(self.threats_file)
         except FileNotFoundError:
             logger.warning(f"Threats file not found: {self.threats_file}")
             return []
     
     def generate_html(self, output_file: str = 'dashboard.html'):
-        """Generate HTML dashboard"""
-        html = f"""
+        """Generate HTML dashboard
+        
+        When the statistics and displayed threats match the ones already in
+        ``output_file``, the file (and its "Last Updated" time) is left as is.
+        """
+        with metrics.timer('dashboard.generate_html'):
+            stats_html, threats_html, digest = self._render_content()
+            if _written_digest(output_file) == digest:
+                metrics.count('dashboard.unchanged_writes_skipped')
+                logger.info(f"Dashboard unchanged: {output_file}")
+                return output_file
+            
+            tmp_file = f"{output_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(self._render_page(stats_html, threats_html, digest))
+            Path(tmp_file).replace(output_file)
+        
+        logger.info(f"Dashboard generated: {output_file}")
+        return output_file
+    
+    def render_html(self) -> str:
+        """Render the dashboard page"""
+        return self._render_page(*self._render_content())
+    
+    def _render_content(self) -> Tuple[str, str, str]:
+        """Render the statistics and threat list, with a digest of both"""
+        with self._lock:
+            stats_html = self._generate_stats_html()
+            threats_html = self._generate_threats_html()
+        digest = hashlib.blake2b(
+            (stats_html + threats_html).encode('utf-8'), digest_size=16
+        ).hexdigest()
+        return stats_html, threats_html, digest
+    
+    def _render_page(self, stats_html: str, threats_html: str, digest: str) -> str:
+        """Fill the page template"""
+        return f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
+    <meta name="content-digest" content="{digest}">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Critical Infrastructure Threat Intelligence Dashboard</title>
     <style>
@@ -267,7 +459,7 @@ class ThreatDashboard:
         </header>
         
         <div class="stats-grid">
-            {self._generate_stats_html()}
+            {stats_html}
         </div>
         
         <div class="threats-section">
@@ -282,7 +474,7 @@ class ThreatDashboard:
             </div>
             
             <div id="threats-container">
-                {self._generate_threats_html()}
+                {threats_html}
             </div>
         </div>
         
@@ -310,27 +502,112 @@ class ThreatDashboard:
                 }}
             }});
         }}
+        
+        // Served live (dashboard.py serve): prepend critical and high threats as they are analyzed
+        function element(tag, className, text) {{
+            const node = document.createElement(tag);
+            node.className = className;
+            if (text !== undefined) node.textContent = text;
+            return node;
+        }}
+        
+        if (window.EventSource && location.protocol.startsWith('http')) {{
+            new EventSource('/api/events').addEventListener('threat', event => {{
+                const threat = JSON.parse(event.data);
+                const analysis = threat.analysis || {{}};
+                const sectors = (threat.custom_properties || {{}}).sectors || [];
+                
+                const card = element('div', 'threat-card ' + analysis.priority);
+                card.dataset.sectors = sectors.join(',');
+                const header = element('div', 'threat-header');
+                header.append(element('div', 'threat-name', threat.name),
+                              element('div', 'threat-priority priority-' + analysis.priority, analysis.priority));
+                card.append(header,
+                            element('div', 'threat-description', threat.description),
+                            element('div', 'threat-meta', 'Risk Score: ' + Number(analysis.risk_score).toFixed(1)));
+                document.getElementById('threats-container').prepend(card);
+            }});
+        }}
     </script>
 </body>
 </html>
 """
+    
+    def threats_page(self, sector: str = None, priority: str = None, source: str = None,
+                     limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> Dict[str, Any]:
+        """One page of the threats matching the filters, highest risk first"""
+        if self.storage is not None:
+            filters = {'sector': sector, 'priority': priority, 'source': source}
+            total = self.storage.count(**filters)
+            threats = self.storage.query(order_by='risk_score', limit=limit, offset=offset, **filters)
+        else:
+            with self._lock:
+                if self._ranked is None:
+                    self._ranked = RankedView(self.threats, key=_risk_score)
+                ranked = self._ranked
+            if sector or priority or source:
+                ranked = RankedView(
+                    [t for t in ranked.unordered() if _matches(t, sector, priority, source)],
+                    key=_risk_score
+                )
+            total = len(ranked)
+            threats = ranked[offset:offset + limit]
+        
+        return {'total': total, 'offset': offset, 'limit': limit, 'threats': threats}
+    
+    def summary(self, sector: str = None, priority: str = None, source: str = None) -> Dict[str, Any]:
+        """Counters and distributions of the threats matching the filters"""
+        if self.storage is not None:
+            aggregate = self.storage.aggregate(sector=sector, priority=priority, source=source)
+        else:
+            aggregate = ThreatAggregate.from_threats(
+                t for t in self.threats if _matches(t, sector, priority, source)
+            )
+        return aggregate.to_dict()
+    
+    def alert_threats(self) -> List[Dict]:
+        """Threats whose priority is pushed to event streams"""
+        if self.storage is not None:
+            return [t for priority in ALERT_PRIORITIES for t in self.storage.iter_threats(priority=priority)]
+        return [t for t in self.threats if t.get('analysis', {}).get('priority') in ALERT_PRIORITIES]
+    
+    def serve(self, host: str = '127.0.0.1', port: int = 8000, analyzer=None):
+        """Serve the live dashboard and its JSON API until interrupted
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
-        
-        logger.info(f"Dashboard generated: {output_file}")
-        return output_file
+        With an in-process ``ThreatAnalyzer``, its critical and high priority
+        threats are pushed to ``/api/events`` as soon as they are analyzed;
+        otherwise they are pushed once they reach the threats file or storage.
+        """
+        server = DashboardServer((host, port), self)
+        if analyzer is not None:
+            analyzer.add_listener(server.announce)
+        logger.info(f"Serving dashboard on http://{host}:{server.server_port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
     
     def _generate_stats_html(self) -> str:
         """Generate statistics cards HTML"""
         if not self.threats:
             return ""
         
-        total = len(self.threats)
-        critical = len([t for t in self.threats if t.get('analysis', {}).get('priority') == 'critical'])
-        high = len([t for t in self.threats if t.get('analysis', {}).get('priority') == 'high'])
-        
-        avg_risk = sum(t.get('analysis', {}).get('risk_score', 0) for t in self.threats) / total if total > 0 else 0
+        if self.storage is not None:
+            summary = self.storage.summary()
+            total = summary['total_threats']
+            critical = summary['priority_distribution'].get('critical', 0)
+            high = summary['priority_distribution'].get('high', 0)
+            avg_risk = summary['average_risk_score']
+        else:
+            if self._aggregate is None:
+                self._aggregate = ThreatAggregate.from_threats(self.threats)
+            aggregate = self._aggregate
+            total = aggregate.total
+            critical = aggregate.priorities['critical']
+            high = aggregate.priorities['high']
+            avg_risk = aggregate.average_risk_score
         
         return f"""
             <div class="stat-card">
@@ -356,37 +633,72 @@ class ThreatDashboard:
         if not self.threats:
             return "<p>No threats to display</p>"
         
-        html = ""
-        
-        for threat in self.threats[:20]:  # Show top 20 threats
-            priority = threat.get('analysis', {}).get('priority', 'medium')
-            risk_score = threat.get('analysis', {}).get('risk_score', 0)
-            sectors = threat.get('custom_properties', {}).get('sectors', [])
-            sectors_str = ','.join(sectors)
-            
-            recommendations = threat.get('analysis', {}).get('recommendations', [])
-            recs_html = ""
-            if recommendations:
-                recs_html = "<div class='recommendations'><h4>Recommended Actions:</h4><ul>"
-                for rec in recommendations[:5]:
-                    recs_html += f"<li>{rec}</li>"
-                recs_html += "</ul></div>"
+        # Show top threats; only the displayed ones need ranking
+        if self._top is None:
+            self._top = top_k(self.threats, self.display_limit, key=_risk_score)
+        top_threats = self._top
+        
+        # Reuse the card of every threat unchanged since the last render
+        fragments = {}
+        cards = []
+        reused = 0
+        for threat in top_threats:
+            threat_id = threat.get('id')
+            fingerprint = (threat.get('modified'), _analysis_digest(threat.get('analysis', {})))
             
-            sectors_tags = "".join([f"<span class='sector-tag'>{s}</span>" for s in sectors])
+            cached = self._fragments.get(threat_id)
+            if cached is not None and cached[0] == fingerprint:
+                card = cached[1]
+                reused += 1
+            else:
+                card = self._generate_threat_card(threat)
             
-            html += f"""
+            if threat_id is not None:
+                fragments[threat_id] = (fingerprint, card)
+            cards.append(card)
+        
+        metrics.count('dashboard.card_cache.hits', reused)
+        metrics.count('dashboard.card_cache.misses', len(cards) - reused)
+        self._fragments = fragments
+        return ''.join(cards)
+    
+    def _generate_threat_card(self, threat: Dict) -> str:
+        """Generate the HTML card of one threat
+        
+        Every feed-supplied value is HTML-escaped; threat text is untrusted.
+        """
+        priority = html.escape(str(threat.get('analysis', {}).get('priority', 'medium')))
+        risk_score = threat.get('analysis', {}).get('risk_score', 0)
+        sectors = [html.escape(str(s)) for s in threat.get('custom_properties', {}).get('sectors', [])]
+        sectors_str = ','.join(sectors)
+        name = html.escape(str(threat.get('name', 'Unknown Threat')))
+        description = html.escape(str(threat.get('description', 'No description available')))
+        source = html.escape(str(threat.get('external_references', [{}])[0].get('source_name', 'Unknown')))
+        
+        recommendations = threat.get('analysis', {}).get('recommendations', [])
+        recs_html = ""
+        if recommendations:
+            recs_html = (
+                "<div class='recommendations'><h4>Recommended Actions:</h4><ul>"
+                + "".join(f"<li>{html.escape(str(rec))}</li>" for rec in recommendations[:5])
+                + "</ul></div>"
+            )
+        
+        sectors_tags = "".join([f"<span class='sector-tag'>{s}</span>" for s in sectors])
+        
+        return f"""
             <div class="threat-card {priority}" data-sectors="{sectors_str}">
                 <div class="threat-header">
-                    <div class="threat-name">{threat.get('name', 'Unknown Threat')}</div>
+                    <div class="threat-name">{name}</div>
                     <div class="threat-priority priority-{priority}">{priority}</div>
                 </div>
-                <div class="threat-description">{threat.get('description', 'No description available')}</div>
+                <div class="threat-description">{description}</div>
                 <div class="threat-meta">
                     <div class="meta-item">
                         <span class="meta-label">Risk Score:</span> {risk_score:.1f}
                     </div>
                     <div class="meta-item">
-                        <span class="meta-label">Source:</span> {threat.get('external_references', [{}])[0].get('source_name', 'Unknown')}
+                        <span class="meta-label">Source:</span> {source}
                     </div>
                     <div class="meta-item">
                         <span class="meta-label">Sectors:</span> {sectors_tags}
@@ -395,13 +707,294 @@ class ThreatDashboard:
                 {recs_html}
             </div>
             """
+
+
+class _Response(NamedTuple):
+    """A rendered response body with its validators"""
+    content_type: str
+    body: bytes
+    etag: str
+    gzipped: Optional[bytes]
+
+
+class _HTTPError(Exception):
+    """Request that cannot be answered, with its HTTP status"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(params: Dict[str, str], name: str, default: int, minimum: int, maximum: int = None) -> int:
+    """Parse an integer query parameter"""
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise _HTTPError(400, f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise _HTTPError(400, f"{name} must be between {minimum} and {maximum}"
+                         if maximum is not None else f"{name} must be at least {minimum}")
+    return value
+
+
+class DashboardServer(ThreadingHTTPServer):
+    """Live dashboard: the page, a paginated JSON API and an alert stream
+    
+    Every response is rendered once per data version and cached with its
+    ETag and gzipped body. A request only checks the data version (a file
+    stat or a SQLite pragma); threats are reloaded and responses rendered
+    again only after the data actually changed.
+    
+    ``/api/events`` is a Server-Sent Events stream of critical and high
+    priority threats, announced by an in-process analyzer or found by a
+    background check of the data version every ``watch_interval`` seconds.
+    Each client has a bounded buffer; clients that fall behind are evicted.
+    ``/metrics`` exposes the pipeline metrics of this process to Prometheus.
+    """
+    
+    daemon_threads = True
+    
+    API_PARAMS = ('sector', 'priority', 'source', 'limit', 'offset')
+    
+    def __init__(self, address: Tuple[str, int], dashboard: ThreatDashboard,
+                 watch_interval: float = WATCH_INTERVAL, client_buffer: int = 100):
+        """Bind the server to ``address``"""
+        super().__init__(address, DashboardRequestHandler)
+        self.dashboard = dashboard
+        self._responses = OrderedDict()
+        self._generation = dashboard.generation
+        self._lock = threading.Lock()
+        
+        self.broker = EventBroker(client_buffer=client_buffer)
+        # threat id -> modified of the alert threats already announced (or present
+        # at startup); pruned on reload to the current alerts and recent announcements
+        self._announced = {t['id']: t.get('modified') for t in dashboard.alert_threats() if 'id' in t}
+        # Announced since the last reload, possibly not yet in the dashboard data
+        self._recently_announced = set()
+        self._announce_lock = threading.Lock()
+        
+        self._stopped = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, args=(watch_interval,), daemon=True)
+        self._watcher.start()
+    
+    def announce(self, threat: Dict):
+        """Push a threat to the event streams unless it was already announced"""
+        with self._announce_lock:
+            threat_id = threat.get('id')
+            if threat_id in self._announced and self._announced[threat_id] == threat.get('modified'):
+                return
+            self._announced[threat_id] = threat.get('modified')
+            self._recently_announced.add(threat_id)
+        self.broker.publish('threat', threat)
+    
+    def _reload(self) -> bool:
+        """Reload the dashboard if its data changed, dropping stale responses
         
-        return html
+        Changes made by another thread (``update_threats`` or its own
+        ``reload_if_changed``) count too.
+        """
+        with self._lock:
+            self.dashboard.reload_if_changed()
+            if self.dashboard.generation == self._generation:
+                return False
+            self._generation = self.dashboard.generation
+            self._responses.clear()
+        
+        alerts = self.dashboard.alert_threats()
+        for threat in alerts:
+            self.announce(threat)
+        
+        # Forget threats that left the alert set so the map stays bounded
+        with self._announce_lock:
+            keep = {t.get('id') for t in alerts} | self._recently_announced
+            self._announced = {
+                threat_id: modified for threat_id, modified in self._announced.items()
+                if threat_id in keep
+            }
+            self._recently_announced = set()
+        return True
+    
+    def _watch(self, interval: float):
+        """Check for new data in the background so alerts do not wait for a request"""
+        while not self._stopped.wait(interval):
+            try:
+                self._reload()
+            except Exception as e:
+                logger.error(f"Dashboard reload failed: {e}")
+    
+    def server_close(self):
+        """Stop the watcher and end every event stream"""
+        self._stopped.set()
+        self.broker.close()
+        super().server_close()
+    
+    def response(self, path: str, params: Dict[str, str]) -> _Response:
+        """Return the cached response for a request, rendering it if needed"""
+        # Unknown parameters do not change the response, so they must not split the cache
+        key = (path, tuple((name, params[name]) for name in self.API_PARAMS if params.get(name)))
+        
+        self._reload()
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+                metrics.count('dashboard.response_cache.hits')
+                return response
+            
+            metrics.count('dashboard.response_cache.misses')
+            response = self._render(path, dict(key[1]))
+            self._responses[key] = response
+            if len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+            return response
+    
+    def _render(self, path: str, params: Dict[str, str]) -> _Response:
+        """Render a response body"""
+        filters = {name: params.get(name) for name in ('sector', 'priority', 'source')}
+        
+        if path in ('/', '/index.html'):
+            return self._make_response('text/html; charset=utf-8', self.dashboard.render_html())
+        if path == '/api/threats':
+            page = self.dashboard.threats_page(
+                limit=_int_param(params, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE),
+                offset=_int_param(params, 'offset', 0, 0),
+                **filters
+            )
+            return self._make_response('application/json', json.dumps(page, default=to_json))
+        if path == '/api/summary':
+            return self._make_response('application/json', json.dumps(self.dashboard.summary(**filters)))
+        
+        raise _HTTPError(404, f"Not found: {path}")
+    
+    @staticmethod
+    def _make_response(content_type: str, text: str) -> _Response:
+        body = text.encode('utf-8')
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+        return _Response(content_type, body, etag, gzipped)
+
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    """Answers dashboard requests from the server's response cache"""
+    
+    server_version = 'ThreatDashboard/1.0'
+    
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = {name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items()}
+        
+        if url.path == '/api/events':
+            self._stream_events(params)
+            return
+        if url.path == '/metrics':
+            # Always current, so neither cached nor given an ETag
+            self._send_body(200, PROMETHEUS_CONTENT_TYPE, metrics.to_prometheus().encode('utf-8'),
+                            {'Cache-Control': 'no-store'})
+            return
+        
+        try:
+            response = self.server.response(url.path, params)
+        except _HTTPError as e:
+            self._send_body(e.status, 'application/json', json.dumps({'error': str(e)}).encode('utf-8'))
+            return
+        
+        use_gzip = response.gzipped is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        # Compressed and identity bodies are different representations
+        etag = response.etag[:-1] + '-gzip"' if use_gzip else response.etag
+        
+        if self._not_modified(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+        self._send_body(200, response.content_type,
+                        response.gzipped if use_gzip else response.body, headers)
+    
+    def _stream_events(self, params: Dict[str, str]):
+        """Stream alert events until the client disconnects or is evicted"""
+        try:
+            last_event_id = int(self.headers.get('Last-Event-ID') or params.get('last_event_id') or 0) or None
+        except ValueError:
+            last_event_id = None
+        
+        filters = {name: params.get(name) for name in ('sector', 'priority', 'source')}
+        accepts = (lambda event: _matches(event.data, **filters)) if any(filters.values()) else None
+        subscription = self.server.broker.subscribe(last_event_id, accepts)
+        
+        # A client that stops reading blocks the write; give up on it instead
+        self.connection.settimeout(SSE_WRITE_TIMEOUT)
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('X-Accel-Buffering', 'no')
+            self.end_headers()
+            self.wfile.write(b'retry: 5000\n\n')
+            
+            while not subscription.closed:
+                event = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is not None:
+                    self.wfile.write(event.to_sse())
+                elif not subscription.closed:
+                    self.wfile.write(b': keepalive\n\n')
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            self.server.broker.unsubscribe(subscription)
+            self.close_connection = True
+    
+    def _not_modified(self, etag: str) -> bool:
+        """Whether If-None-Match already names the current representation"""
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        tags = [tag.strip() for tag in header.split(',')]
+        return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+    
+    def _send_body(self, status: int, content_type: str, body: bytes, headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
 
 
 def main():
     """Main execution function"""
-    dashboard = ThreatDashboard()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Generate or serve the threat intelligence dashboard')
+    parser.add_argument('mode', nargs='?', choices=['generate', 'serve'], default='generate',
+                        help='Write dashboard.html once, or serve it live with a JSON API')
+    parser.add_argument('--input', default='data/analyzed_threats.json',
+                        help='Analyzed threats file (JSON array or NDJSON, optionally gzip/zstd)')
+    parser.add_argument('--db', help='Read threats from this SQLite storage database instead')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to serve on')
+    parser.add_argument('--port', type=int, default=8000, help='Port to serve on')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Time rendering and cache use, exposed at /metrics when serving')
+    args = parser.parse_args()
+    
+    metrics.enabled = args.metrics
+    storage = ThreatStorage(args.db) if args.db else None
+    dashboard = ThreatDashboard(args.input, storage=storage)
+    
+    if args.mode == 'serve':
+        dashboard.serve(args.host, args.port)
+        return
+    
     output_file = dashboard.generate_html()
     
     print(f"\n{'='*60}")
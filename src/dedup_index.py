@@ -0,0 +1,78 @@
+"""
+Persistent Deduplication Index
+Remembers threat fingerprints across collection runs
+"""
+
+import sqlite3
+import time
+import logging
+from pathlib import Path
+from typing import Iterable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DedupIndex:
+    """SQLite-backed set of threat fingerprints with a time-to-live
+    
+    A fingerprint is treated as new again once it is older than
+    ``ttl_days``, matching how long stored threats are retained.
+    """
+    
+    def __init__(self, path: str = 'data/dedup_index.db', ttl_days: int = 365):
+        """Open (or create) the index at ``path``"""
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS fingerprints '
+            '(fingerprint TEXT PRIMARY KEY, first_seen REAL NOT NULL) WITHOUT ROWID'
+        )
+        self.conn.commit()
+        
+        pruned = self.prune()
+        if pruned:
+            logger.info(f"Pruned {pruned} expired fingerprints from {path}")
+    
+    def __contains__(self, fingerprint: str) -> bool:
+        row = self.conn.execute(
+            'SELECT 1 FROM fingerprints WHERE fingerprint = ? AND first_seen >= ?',
+            (fingerprint, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return row is not None
+    
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+    
+    def add_many(self, fingerprints: Iterable[str]) -> int:
+        """Record fingerprints in one transaction, returning how many were new
+        
+        Expired fingerprints are recorded again with the current time.
+        """
+        now = time.time()
+        cursor = self.conn.executemany(
+            'INSERT INTO fingerprints (fingerprint, first_seen) VALUES (?, ?) '
+            'ON CONFLICT(fingerprint) DO UPDATE SET first_seen = excluded.first_seen '
+            'WHERE first_seen < ?',
+            ((fingerprint, now, now - self.ttl_seconds) for fingerprint in fingerprints)
+        )
+        self.conn.commit()
+        return cursor.rowcount
+    
+    def prune(self) -> int:
+        """Delete fingerprints older than the TTL"""
+        cursor = self.conn.execute(
+            'DELETE FROM fingerprints WHERE first_seen < ?',
+            (time.time() - self.ttl_seconds,)
+        )
+        self.conn.commit()
+        return cursor.rowcount
+    
+    def close(self):
+        """Close the index"""
+        self.conn.close()
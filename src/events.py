@@ -0,0 +1,156 @@
+"""
+Threat Events
+In-process publish/subscribe of threat alerts for server-sent event streams
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, List, NamedTuple, Optional
+
+try:
+    from .threat_record import to_json
+except ImportError:
+    from threat_record import to_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Priorities pushed to subscribers as soon as a threat is analyzed
+ALERT_PRIORITIES = ('critical', 'high')
+
+
+class Event(NamedTuple):
+    """One published event"""
+    id: int
+    type: str
+    data: Any
+    payload: str    # ``data`` as JSON, serialized once for every subscriber
+    
+    def to_sse(self) -> bytes:
+        """Encode in the ``text/event-stream`` wire format"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.payload}\n\n".encode('utf-8')
+
+
+class Subscription:
+    """A subscriber's bounded event buffer
+    
+    Publishing never blocks: a subscriber whose buffer is full has fallen
+    too far behind and is evicted, dropping its buffered events. Its stream
+    ends, and clients reconnect (with ``Last-Event-ID``) to resume.
+    """
+    
+    def __init__(self, max_events: int, accepts: Callable[[Event], bool] = None):
+        """Initialize empty buffer"""
+        self.max_events = max_events
+        self.accepts = accepts
+        self.closed = False
+        self.evicted = False
+        self._events = deque()
+        self._ready = threading.Condition()
+    
+    def offer(self, event: Event) -> bool:
+        """Buffer an event; returns False once the subscription is closed"""
+        if self.accepts is not None and not self.accepts(event):
+            return not self.closed
+        
+        with self._ready:
+            if self.closed:
+                return False
+            if len(self._events) >= self.max_events:
+                self.evicted = True
+                self._close()
+                return False
+            self._events.append(event)
+            self._ready.notify()
+            return True
+    
+    def get(self, timeout: float = None) -> Optional[Event]:
+        """Next buffered event, or None on timeout or once closed"""
+        with self._ready:
+            self._ready.wait_for(lambda: self._events or self.closed, timeout)
+            if self._events and not self.closed:
+                return self._events.popleft()
+            return None
+    
+    def close(self):
+        """End the subscription, waking a waiting reader"""
+        with self._ready:
+            self._close()
+    
+    def _close(self):
+        """Close with the condition held"""
+        self.closed = True
+        self._events.clear()
+        self._ready.notify_all()
+
+
+class EventBroker:
+    """Fans published events out to subscribers
+    
+    Recent events are kept for replay, so a client reconnecting after an
+    eviction or a network error receives what it missed.
+    """
+    
+    def __init__(self, client_buffer: int = 100, history: int = 100):
+        """Initialize broker"""
+        self.client_buffer = client_buffer
+        self._subscribers: List[Subscription] = []
+        self._history = deque(maxlen=history)
+        self._next_id = 1
+        self._lock = threading.Lock()
+    
+    def subscribe(self, last_event_id: int = None,
+                  accepts: Callable[[Event], bool] = None) -> Subscription:
+        """Add a subscriber, first replaying events after ``last_event_id``"""
+        subscription = Subscription(self.client_buffer, accepts)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event.id > last_event_id:
+                        subscription.offer(event)
+            self._subscribers.append(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber"""
+        subscription.close()
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+    
+    def publish(self, event_type: str, data: Any) -> Event:
+        """Send an event to every subscriber, evicting those that fell behind"""
+        payload = json.dumps(data, default=to_json)
+        
+        with self._lock:
+            event = Event(self._next_id, event_type, data, payload)
+            self._next_id += 1
+            self._history.append(event)
+            
+            kept = []
+            evicted = 0
+            for subscription in self._subscribers:
+                if subscription.offer(event):
+                    kept.append(subscription)
+                elif subscription.evicted:
+                    evicted += 1
+            self._subscribers = kept
+        
+        if evicted:
+            logger.warning(f"Evicted {evicted} slow event subscribers")
+        return event
+    
+    @property
+    def subscriber_count(self) -> int:
+        """Number of live subscriptions"""
+        with self._lock:
+            return len(self._subscribers)
+    
+    def close(self):
+        """End every subscription"""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            subscription.close()
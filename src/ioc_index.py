@@ -0,0 +1,236 @@
+"""
+IOC Lookup Index
+Matches observables from logs against the IOCs of collected threats
+"""
+
+import ipaddress
+import logging
+import re
+from typing import List, Dict, Iterable, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_HEX_HASH = re.compile(r'^[0-9a-fA-F]{32}$|^[0-9a-fA-F]{40}$|^[0-9a-fA-F]{64}$')
+
+
+def _parse_ipv4(value: str) -> Optional[int]:
+    """Parse a dotted-quad IPv4 address to an int, or None if it is not one
+    
+    Much cheaper than ``ipaddress.ip_address`` for the common case. Like it,
+    rejects octets with leading zeros, which some parsers read as octal.
+    """
+    parts = value.split('.')
+    if len(parts) != 4:
+        return None
+    
+    address = 0
+    for part in parts:
+        if not (part.isascii() and part.isdigit()) or len(part) > 3:
+            return None
+        if len(part) > 1 and part[0] == '0':
+            return None
+        octet = int(part)
+        if octet > 255:
+            return None
+        address = (address << 8) | octet
+    
+    return address
+
+
+class _RadixTree:
+    """Binary radix tree for longest-prefix matching of IP networks"""
+    
+    def __init__(self, bits: int):
+        self.bits = bits
+        # Each node is [zero child, one child, threat ids or None]
+        self.root = [None, None, None]
+    
+    def insert(self, network: int, prefix_len: int, threat_id: str):
+        node = self.root
+        for i in range(prefix_len):
+            bit = (network >> (self.bits - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        
+        if node[2] is None:
+            node[2] = []
+        if threat_id not in node[2]:
+            node[2].append(threat_id)
+    
+    def longest_match(self, address: int) -> List[str]:
+        node = self.root
+        best = node[2]
+        shift = self.bits - 1
+        
+        while shift >= 0:
+            node = node[(address >> shift) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                best = node[2]
+            shift -= 1
+        
+        return list(best) if best else []
+
+
+class IOCIndex:
+    """Index of threat IOCs supporting fast observable lookup
+    
+    IP addresses and CIDR ranges use longest-prefix matching, domains match
+    on any parent domain, and file hashes, email addresses and CVEs use
+    exact hash-table lookup. Lookups return STIX threat ids.
+    """
+    
+    def __init__(self):
+        """Initialize an empty index"""
+        self._ipv4 = _RadixTree(32)
+        self._ipv6 = _RadixTree(128)
+        self._domains = [{}, None]  # [children by label, threat ids]
+        self._exact: Dict[str, List[str]] = {}
+        self.threats: Dict[str, Dict] = {}
+    
+    @classmethod
+    def build(cls, threats: Iterable[Dict]) -> 'IOCIndex':
+        """Build an index from STIX threats"""
+        index = cls()
+        for threat in threats:
+            index.add_threat(threat)
+        
+        logger.info(f"Indexed IOCs from {len(index.threats)} threats")
+        return index
+    
+    def __len__(self) -> int:
+        return len(self.threats)
+    
+    def add_threat(self, threat: Dict):
+        """Index every IOC of a threat"""
+        threat_id = threat['id']
+        props = threat.get('custom_properties', {})
+        self.threats[threat_id] = threat
+        
+        for ioc_type, values in props.get('iocs', {}).items():
+            for value in (values if isinstance(values, list) else [values]):
+                if ioc_type == 'ip_addresses':
+                    self._add_ip(str(value), threat_id)
+                elif ioc_type == 'domains':
+                    self._add_domain(str(value), threat_id)
+                else:
+                    self._add_exact(str(value), threat_id)
+        
+        for cve in props.get('cve', []):
+            self._add_exact(cve, threat_id)
+    
+    def _add_ip(self, value: str, threat_id: str):
+        try:
+            network = ipaddress.ip_network(value.strip(), strict=False)
+        except ValueError:
+            logger.debug(f"Skipping invalid IP IOC: {value}")
+            return
+        
+        tree = self._ipv4 if network.version == 4 else self._ipv6
+        tree.insert(int(network.network_address), network.prefixlen, threat_id)
+    
+    def _add_domain(self, value: str, threat_id: str):
+        node = self._domains
+        for label in reversed(value.strip().lower().rstrip('.').split('.')):
+            node = node[0].setdefault(label, [{}, None])
+        
+        if node[1] is None:
+            node[1] = []
+        if threat_id not in node[1]:
+            node[1].append(threat_id)
+    
+    def _add_exact(self, value: str, threat_id: str):
+        ids = self._exact.setdefault(value.strip().lower(), [])
+        if threat_id not in ids:
+            ids.append(threat_id)
+    
+    def match_ip(self, value: str) -> List[str]:
+        """Return threats whose most specific IP/CIDR IOC contains ``value``"""
+        try:
+            address = ipaddress.ip_address(value.strip())
+        except ValueError:
+            return []
+        
+        tree = self._ipv4 if address.version == 4 else self._ipv6
+        return tree.longest_match(int(address))
+    
+    def match_domain(self, value: str) -> List[str]:
+        """Return threats listing ``value`` or any of its parent domains
+        
+        The most specific domain's threats come first.
+        """
+        matches = []
+        node = self._domains
+        
+        for label in reversed(value.strip().lower().rstrip('.').split('.')):
+            node = node[0].get(label)
+            if node is None:
+                break
+            if node[1]:
+                matches = node[1] + [t for t in matches if t not in node[1]]
+        
+        return matches
+    
+    def match_exact(self, value: str) -> List[str]:
+        """Return threats listing a file hash, email address or CVE"""
+        return list(self._exact.get(value.strip().lower(), []))
+    
+    def match(self, observable: str, ioc_type: Optional[str] = None) -> List[str]:
+        """Return threat ids matching an observable, detecting its type if not given"""
+        if ioc_type is None:
+            address = _parse_ipv4(observable.strip())
+            if address is not None:
+                return self._ipv4.longest_match(address)
+            ioc_type = self.detect_type(observable)
+        
+        if ioc_type == 'ip_addresses':
+            return self.match_ip(observable)
+        if ioc_type == 'domains':
+            # Exact IOCs (such as URLs) first, then the domain and its parents
+            exact = self.match_exact(observable)
+            return exact + [t for t in self.match_domain(observable) if t not in exact]
+        return self.match_exact(observable)
+    
+    def match_many(self, observables: Iterable[str]) -> Dict[str, List[str]]:
+        """Match a batch of observables, returning only those that hit
+        
+        Each distinct observable is looked up once, so repeated values in
+        log batches cost a dictionary lookup. Memory grows with the number
+        of distinct observables, so split unbounded streams into batches.
+        """
+        matched = {}
+        for observable in observables:
+            if observable not in matched:
+                matched[observable] = self.match(observable)
+        
+        return {observable: matches for observable, matches in matched.items() if matches}
+    
+    def get_threat(self, threat_id: str) -> Optional[Dict]:
+        """Return an indexed threat by STIX id"""
+        return self.threats.get(threat_id)
+    
+    @staticmethod
+    def detect_type(observable: str) -> str:
+        """Guess the IOC type of an observable"""
+        value = observable.strip()
+        
+        if '@' in value:
+            return 'email_addresses'
+        if value.upper().startswith('CVE-'):
+            return 'cve'
+        if _HEX_HASH.match(value):
+            return 'file_hashes'
+        if _parse_ipv4(value) is not None:
+            return 'ip_addresses'
+        if ':' in value:
+            try:
+                ipaddress.ip_address(value)
+                return 'ip_addresses'
+            except ValueError:
+                pass
+        if '.' in value:
+            return 'domains'
+        return 'file_hashes'
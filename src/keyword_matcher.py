@@ -0,0 +1,115 @@
+"""
+Keyword Matcher
+Aho-Corasick multi-pattern matching for threat descriptions
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, List
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """Finds every keyword occurring in a text in a single pass
+    
+    Keywords are matched case-insensitively as substrings, like
+    ``keyword in text.lower()``. Results are cached per text, so analyzers
+    sharing a matcher scan each description only once.
+    """
+    
+    def __init__(self, keywords: Iterable[str] = (), cache_size: int = 65536):
+        """Build the automaton for ``keywords``"""
+        self.keywords = frozenset(kw.lower() for kw in keywords if kw)
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, FrozenSet[str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._build()
+    
+    def _build(self):
+        """Build goto, failure and output tables"""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[FrozenSet[str]] = [frozenset()]
+        
+        for keyword in self.keywords:
+            node = 0
+            for ch in keyword:
+                if ch not in goto[node]:
+                    goto.append({})
+                    outputs.append(frozenset())
+                    goto[node][ch] = len(goto) - 1
+                node = goto[node][ch]
+            outputs[node] = outputs[node] | {keyword}
+        
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0)
+                outputs[child] = outputs[child] | outputs[fail[child]]
+        
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+    
+    def extend(self, keywords: Iterable[str]):
+        """Add keywords, rebuilding the automaton only if any are new"""
+        new_keywords = frozenset(kw.lower() for kw in keywords if kw) - self.keywords
+        if not new_keywords:
+            return
+        
+        with self._lock:
+            self.keywords = self.keywords | new_keywords
+            self._build()
+            self._cache.clear()
+    
+    def find(self, text: str) -> FrozenSet[str]:
+        """Return the set of keywords occurring in ``text``"""
+        with self._lock:
+            hits = self._cache.get(text)
+            if hits is not None:
+                self._cache.move_to_end(text)
+        
+        if hits is not None:
+            metrics.count('keyword_matcher.cache.hits')
+            return hits
+        
+        metrics.count('keyword_matcher.cache.misses')
+        hits = self._scan(text.lower())
+        
+        with self._lock:
+            self._cache[text] = hits
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        
+        return hits
+    
+    def _scan(self, text: str) -> FrozenSet[str]:
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        node = 0
+        hits = set()
+        
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if outputs[node]:
+                hits.update(outputs[node])
+        
+        return frozenset(hits)
+
+
+# Shared by all analyzers so each description is scanned once per process
+shared_matcher = KeywordMatcher()
@@ -0,0 +1,309 @@
+"""
+Pipeline Metrics
+Stage timers and counters, exported as a JSON run report or Prometheus text
+"""
+
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Counters named '<cache>.hits' and '<cache>.misses' are reported as a hit rate
+_HITS_SUFFIX = '.hits'
+_MISSES_SUFFIX = '.misses'
+_INVALID_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_]')
+
+
+class _StageTimer:
+    """Times one stage execution and records it on exit"""
+    
+    __slots__ = ('metrics', 'name', 'items', 'started')
+    
+    def __init__(self, metrics: 'Metrics', name: str, items: int = None):
+        self.metrics = metrics
+        self.name = name
+        # May be set inside the block once the number of items is known
+        self.items = items
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, time.perf_counter() - self.started, self.items)
+
+
+class _NullTimer:
+    """Shared stand-in for ``_StageTimer`` while metrics are disabled"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        pass
+    
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Stage timers and counters for the pipeline
+    
+    Timers record calls, seconds, the slowest call and items processed per
+    stage; counters hold totals such as bytes read or cache hits. Totals
+    only grow, as Prometheus expects; ``start_run`` marks the start of a
+    run, and ``run_report`` gives what happened since.
+    
+    While disabled, ``timer`` returns a shared no-op context manager and
+    ``count`` returns at once, so instrumented code costs an attribute
+    check per call.
+    """
+    
+    def __init__(self, enabled: bool = False, namespace: str = 'threatintel'):
+        """Initialize empty metrics"""
+        self.enabled = enabled
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        # stage -> [calls, seconds, max seconds, items]
+        self._stages: Dict[str, List] = {}
+        self._counters: Dict[str, float] = {}
+        # Time spent pulling from upstream timed iterators, per thread
+        self._local = threading.local()
+        self._run_started = datetime.now()
+        self._run_clock = time.perf_counter()
+        self._run_stages: Dict[str, List] = {}
+        self._run_counters: Dict[str, float] = {}
+    
+    def configure(self, config: Dict):
+        """Enable metrics if the ``metrics.enabled`` setting asks for it"""
+        if config.get('metrics', {}).get('enabled'):
+            self.enabled = True
+    
+    def timer(self, stage: str, items: int = None):
+        """Context manager timing one execution of ``stage``
+        
+        ``items`` (or the ``items`` attribute of the returned timer, set
+        inside the block) is the number of threats the stage produced.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage, items)
+    
+    def timed(self, stage: str) -> Callable:
+        """Decorator timing every call of a function as ``stage``
+        
+        When the function returns a sequence, its length is recorded as the
+        number of items produced.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                
+                started = time.perf_counter()
+                result = func(*args, **kwargs)
+                items = len(result) if isinstance(result, Sequence) and not isinstance(result, str) else None
+                self.record(stage, time.perf_counter() - started, items)
+                return result
+            return wrapper
+        return decorator
+    
+    def iter_timed(self, stage: str, iterable: Iterable) -> Iterable:
+        """Time the items of a lazy pipeline stage as they are pulled
+        
+        For chained generators, where stages run interleaved: the time a
+        stage spends waiting on an upstream ``iter_timed`` stage is not
+        counted as its own. Returns ``iterable`` itself while disabled.
+        """
+        if not self.enabled:
+            return iterable
+        return self._iter_timed(stage, iter(iterable))
+    
+    def _iter_timed(self, stage: str, iterator: Iterator) -> Iterator:
+        local = self._local
+        seconds = 0.0
+        items = 0
+        
+        try:
+            while True:
+                outer = getattr(local, 'upstream', 0.0)
+                local.upstream = 0.0
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed = time.perf_counter() - started
+                    seconds += elapsed - local.upstream
+                    local.upstream = outer + elapsed
+                
+                items += 1
+                yield item
+        finally:
+            self.record(stage, seconds, items)
+    
+    def record(self, stage: str, seconds: float, items: int = None):
+        """Add one timed execution of ``stage``"""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += items or 0
+    
+    def count(self, name: str, value: float = 1):
+        """Add ``value`` to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+    
+    def start_run(self):
+        """Start a new run; ``run_report`` covers everything recorded after this"""
+        with self._lock:
+            self._run_started = datetime.now()
+            self._run_clock = time.perf_counter()
+            self._run_stages = {stage: list(stats) for stage, stats in self._stages.items()}
+            self._run_counters = dict(self._counters)
+    
+    def reset(self):
+        """Drop every recorded value and start a new run"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+        self.start_run()
+    
+    def run_report(self) -> Dict[str, Any]:
+        """Stage timings, throughput, counters and cache hit rates of the current run"""
+        with self._lock:
+            duration = time.perf_counter() - self._run_clock
+            stages = {}
+            for stage, (calls, seconds, slowest, items) in self._stages.items():
+                previous = self._run_stages.get(stage, [0, 0.0, 0.0, 0])
+                calls -= previous[0]
+                if not calls:
+                    continue
+                seconds -= previous[1]
+                items -= previous[3]
+                stages[stage] = {
+                    'calls': calls,
+                    'seconds': round(seconds, 6),
+                    # The slowest call since the process started
+                    'max_seconds': round(slowest, 6),
+                    'items': items,
+                    'items_per_second': round(items / seconds, 2) if items and seconds > 0 else None
+                }
+            counters = {
+                name: value - self._run_counters.get(name, 0)
+                for name, value in self._counters.items()
+                if value != self._run_counters.get(name, 0)
+            }
+        
+        return {
+            'started': self._run_started.isoformat(),
+            'duration_seconds': round(duration, 6),
+            'stages': stages,
+            'counters': counters,
+            'cache_hit_rates': _hit_rates(counters)
+        }
+    
+    def write_report(self, output_path: str) -> Dict[str, Any]:
+        """Write the current run report as JSON and return it"""
+        report = self.run_report()
+        path = Path(output_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        
+        logger.info(f"Run report saved to {output_path}")
+        return report
+    
+    def to_prometheus(self) -> str:
+        """Every total since the process started, in the Prometheus text format"""
+        prefix = self.namespace
+        with self._lock:
+            stages = sorted((stage, list(stats)) for stage, stats in self._stages.items())
+            counters = sorted(self._counters.items())
+        
+        lines = []
+        if stages:
+            series = (
+                ('stage_calls_total', 'counter', 'Executions of each pipeline stage', 0),
+                ('stage_seconds_total', 'counter', 'Seconds spent in each pipeline stage', 1),
+                ('stage_max_seconds', 'gauge', 'Slowest execution of each pipeline stage', 2),
+                ('stage_items_total', 'counter', 'Threats handled by each pipeline stage', 3),
+            )
+            for name, metric_type, help_text, index in series:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+                for stage, stats in stages:
+                    lines.append(f'{prefix}_{name}{{stage="{_label(stage)}"}} {_number(stats[index])}')
+        
+        for name, value in counters:
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {_number(value)}")
+        
+        hit_rates = _hit_rates(dict(counters))
+        if hit_rates:
+            lines.append(f"# HELP {prefix}_cache_hit_ratio Share of cache lookups that hit")
+            lines.append(f"# TYPE {prefix}_cache_hit_ratio gauge")
+            for cache, rate in sorted(hit_rates.items()):
+                lines.append(f'{prefix}_cache_hit_ratio{{cache="{_label(cache)}"}} {_number(rate)}')
+        
+        return '\n'.join(lines) + '\n'
+
+
+def _hit_rates(counters: Dict[str, float]) -> Dict[str, float]:
+    """Hit rate of every cache with '.hits' or '.misses' counters"""
+    caches = {
+        name[:-len(suffix)]
+        for name in counters
+        for suffix in (_HITS_SUFFIX, _MISSES_SUFFIX)
+        if name.endswith(suffix)
+    }
+    
+    rates = {}
+    for cache in caches:
+        hits = counters.get(cache + _HITS_SUFFIX, 0)
+        lookups = hits + counters.get(cache + _MISSES_SUFFIX, 0)
+        if lookups:
+            rates[cache] = round(hits / lookups, 4)
+    return rates
+
+
+def _metric_name(name: str) -> str:
+    """Turn a dotted counter name into a valid Prometheus metric name"""
+    return _INVALID_NAME_CHARS.sub('_', name)
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    """Format a sample value"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Shared by every pipeline stage in the process; disabled until configured
+metrics = Metrics()
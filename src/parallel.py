@@ -0,0 +1,35 @@
+"""
+Parallel Analysis Helpers
+Chunked process-pool execution for large threat batches
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Sequence
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def map_chunks(func: Callable[[List[Any]], List[Any]], items: Sequence[Any],
+               workers: int = None, chunk_size: int = None) -> List[Any]:
+    """Apply ``func`` to chunks of ``items`` on a process pool
+    
+    ``func`` takes a list and returns a list of the same length; it must be
+    a picklable module-level function (or a ``functools.partial`` of one).
+    Results are concatenated in input order, so callers get exactly what
+    the serial loop would produce.
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # A few chunks per worker keeps the pool busy when chunks finish unevenly
+        chunk_size = max(1, -(-len(items) // (workers * 4)))
+    
+    chunks = [list(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        return [result for chunk in chunks for result in func(chunk)]
+    
+    logger.info(f"Processing {len(items)} items in {len(chunks)} chunks on {workers} processes")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [result for chunk_results in pool.map(func, chunks) for result in chunk_results]
@@ -0,0 +1,97 @@
+"""
+Threat Ranking Helpers
+Top-K selection and lazily sorted result views
+"""
+
+import heapq
+import logging
+from collections.abc import Sequence
+from typing import Any, Callable, Iterable, Iterator, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Items ranked up front when a view is iterated
+_ITER_HEAD = 32
+
+
+def top_k(items: Iterable[Any], k: int, key: Callable[[Any], Any]) -> List[Any]:
+    """Return the ``k`` highest-ranked items, highest first
+    
+    Uses a bounded heap, so selecting the head of ``n`` items costs
+    O(n log k). Ties keep their input order, exactly like
+    ``sorted(items, key=key, reverse=True)[:k]``.
+    """
+    if k <= 0:
+        return []
+    return heapq.nlargest(k, items, key=key)
+
+
+class RankedView(Sequence):
+    """Read-only sequence of items in descending ``key`` order, sorted on demand
+    
+    Indexing or slicing the head only selects as many items as are needed;
+    the full sort happens once something past the selected prefix (or from
+    the end) is accessed. The order is the same as a stable
+    ``sorted(items, key=key, reverse=True)``.
+    """
+    
+    def __init__(self, items: Iterable[Any], key: Callable[[Any], Any]):
+        """Initialize view over ``items``"""
+        self._items = items if isinstance(items, list) else list(items)
+        self._key = key
+        self._ranked = []
+        self._sorted = not self._items
+    
+    def unordered(self) -> List[Any]:
+        """Return the items in their original order, without ranking them"""
+        return self._items
+    
+    def _rank(self, n: int):
+        """Make sure at least the first ``n`` items are ranked"""
+        if self._sorted or n <= len(self._ranked):
+            return
+        
+        total = len(self._items)
+        # Grow the prefix geometrically; past a quarter of the items a full sort is cheaper
+        n = max(n, 2 * len(self._ranked))
+        if n * 4 >= total:
+            self._ranked = sorted(self._items, key=self._key, reverse=True)
+            self._sorted = True
+        else:
+            self._ranked = heapq.nlargest(n, self._items, key=self._key)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.start, index.stop, index.step
+            if (stop is not None and stop >= 0 and (start is None or start >= 0)
+                    and (step is None or step > 0)):
+                self._rank(stop)
+            else:
+                self._rank(len(self._items))
+            return self._ranked[index]
+        
+        if index < 0:
+            index += len(self._items)
+        if not 0 <= index < len(self._items):
+            raise IndexError('RankedView index out of range')
+        
+        self._rank(index + 1)
+        return self._ranked[index]
+    
+    def __iter__(self) -> Iterator[Any]:
+        # Select a short head with one heap pass; reading past it sorts everything once
+        for i in range(len(self._items)):
+            self._rank(_ITER_HEAD if i < _ITER_HEAD else len(self._items))
+            yield self._ranked[i]
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (RankedView, list)):
+            return list(self) == list(other)
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"RankedView({len(self._items)} items, {len(self._ranked)} ranked)"
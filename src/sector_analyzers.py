@@ -4,12 +4,85 @@ Specialized analysis for Financial Services and Agriculture sectors
 """
 
 import logging
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, Mapping, Sequence
 from datetime import datetime
 
+try:
+    from .keyword_matcher import shared_matcher
+    from .parallel import map_chunks
+    from .ranking import RankedView
+    from .threat_record import enrich, freeze
+    from .aggregates import ThreatAggregate
+    from .threat_io import read_threats
+    from .metrics import metrics
+except ImportError:
+    from keyword_matcher import shared_matcher
+    from parallel import map_chunks
+    from ranking import RankedView
+    from threat_record import enrich, freeze
+    from aggregates import ThreatAggregate
+    from threat_io import read_threats
+    from metrics import metrics
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Analysis fragments that only depend on a threat's severity or type are
+# built once and shared by every threat, so they are frozen (read-only
+# mappings and tuples); the JSON hook in threat_record serializes them.
+_AFFECTED_ASSETS = freeze({
+    'malware': ('core_banking', 'endpoints', 'file_servers'),
+    'fraud': ('wire_transfer', 'online_banking', 'email_systems'),
+    'vulnerability': ('web_applications', 'network_infrastructure')
+})
+
+_IMPACT_LEVELS = freeze({
+    'critical': {
+        'operational': 'severe',
+        'financial': 'high',
+        'reputational': 'high',
+        'estimated_downtime_hours': 24
+    },
+    'high': {
+        'operational': 'moderate',
+        'financial': 'moderate',
+        'reputational': 'moderate',
+        'estimated_downtime_hours': 8
+    },
+    'medium': {
+        'operational': 'low',
+        'financial': 'low',
+        'reputational': 'low',
+        'estimated_downtime_hours': 2
+    }
+})
+
+_REGULATORY_REPORTING = freeze({
+    'critical': {'required': True, 'agencies': ('NCUA', 'FCA', 'FinCEN', 'FBI'), 'timeframe_hours': 24},
+    'high': {'required': True, 'agencies': ('NCUA', 'FCA'), 'timeframe_hours': 72},
+    None: {'required': False, 'agencies': (), 'timeframe_hours': 72}
+})
+
+_RURAL_CONSIDERATIONS = freeze({
+    'limited_connectivity': True,
+    'remote_locations': True,
+    'limited_it_resources': True,
+    'response_challenges': ('geographic_dispersion', 'limited_bandwidth', 'staff_availability')
+})
+
+_SUPPLY_CHAIN_STAGES = ('production', 'processing', 'distribution')
+
+_IOT_DEVICE_TYPES = ('sensors', 'automated_equipment', 'monitoring_systems')
+
+_MITIGATION_CHALLENGES = (
+    'Limited IT staff in rural areas',
+    'Difficulty patching IoT devices in the field',
+    'Seasonal operational constraints',
+    'Legacy equipment compatibility'
+)
+_IOT_MITIGATION_CHALLENGES = _MITIGATION_CHALLENGES + ('IoT device lifecycle management',)
+
 
 class FinancialServicesAnalyzer:
     """Specialized threat analyzer for financial services sector"""
@@ -45,127 +118,114 @@ class FinancialServicesAnalyzer:
                 'high_risk_threats': ['ransomware', 'ddos', 'insider_threats']
             }
         }
+        
+        # (frameworks, reporting required) -> shared, frozen compliance impact
+        self._compliance_impacts = {}
     
+    @metrics.timed('sector.financial_services')
     def analyze_threats(self, threat_data: List[Dict], 
                        institution_type: str = 'credit_union',
-                       compliance_frameworks: List[str] = None) -> List[Dict]:
-        """Analyze threats specific to financial services"""
+                       compliance_frameworks: List[str] = None,
+                       workers: int = None) -> Sequence[Dict]:
+        """Analyze threats specific to financial services
+        
+        The result is ordered by mitigation priority and, like
+        ``ThreatAnalyzer.analyze``, only sorted as far as it is read. With
+        ``workers`` > 1 the relevant threats are analyzed in chunks on a
+        process pool; the result is the same as the serial path.
+        """
         logger.info(f"Analyzing threats for {institution_type}...")
         
         if compliance_frameworks is None:
             compliance_frameworks = ['FFIEC', 'FCA']
         
-        analyzed_threats = []
+        # Check if threat is relevant to financial services
+        relevant = [t for t in threat_data if self._is_relevant_to_financial_services(t)]
         
-        for threat in threat_data:
-            # Check if threat is relevant to financial services
-            if not self._is_relevant_to_financial_services(threat):
-                continue
-            
-            # Enrich with financial services context
-            enriched_threat = {
-                **threat,
-                'financial_services_analysis': {
-                    'institution_type': institution_type,
-                    'affected_assets': self._identify_affected_assets(threat, institution_type),
-                    'compliance_impact': self._assess_compliance_impact(threat, compliance_frameworks),
-                    'business_impact': self._assess_business_impact(threat, institution_type),
-                    'regulatory_reporting': self._determine_regulatory_reporting(threat),
-                    'mitigation_priority': self._calculate_mitigation_priority(threat, institution_type)
-                }
-            }
-            
-            analyzed_threats.append(enriched_threat)
+        if workers and workers > 1:
+            analyses = map_chunks(
+                partial(_financial_services_chunk,
+                        institution_type=institution_type,
+                        compliance_frameworks=compliance_frameworks,
+                        framework_definitions=self.compliance_frameworks,
+                        institution_types=self.institution_types),
+                [_financial_services_fields(t) for t in relevant],
+                workers=workers
+            )
+        else:
+            analyses = [
+                self._analyze_threat(t, institution_type, compliance_frameworks)
+                for t in relevant
+            ]
         
-        # Sort by mitigation priority
-        analyzed_threats.sort(
-            key=lambda x: x['financial_services_analysis']['mitigation_priority'],
-            reverse=True
-        )
+        # Enrich with financial services context
+        analyzed_threats = [
+            enrich(threat, 'financial_services_analysis', analysis)
+            for threat, analysis in zip(relevant, analyses)
+        ]
+        
+        # Rank by mitigation priority
+        analyzed_threats = RankedView(analyzed_threats, key=_mitigation_priority_key)
         
         logger.info(f"Identified {len(analyzed_threats)} relevant threats for financial services")
         return analyzed_threats
     
+    def _analyze_threat(self, threat: Dict, institution_type: str,
+                        compliance_frameworks: List[str]) -> Dict[str, Any]:
+        """Build the financial services analysis of one threat"""
+        return {
+            'institution_type': institution_type,
+            'affected_assets': self._identify_affected_assets(threat, institution_type),
+            'compliance_impact': self._assess_compliance_impact(threat, compliance_frameworks),
+            'business_impact': self._assess_business_impact(threat, institution_type),
+            'regulatory_reporting': self._determine_regulatory_reporting(threat),
+            'mitigation_priority': self._calculate_mitigation_priority(threat, institution_type)
+        }
+    
     def _is_relevant_to_financial_services(self, threat: Dict) -> bool:
         """Check if threat is relevant to financial services"""
         sectors = threat.get('custom_properties', {}).get('sectors', [])
         return 'financial_services' in sectors
     
-    def _identify_affected_assets(self, threat: Dict, institution_type: str) -> List[str]:
+    def _identify_affected_assets(self, threat: Dict, institution_type: str) -> Sequence[str]:
         """Identify which assets are likely affected"""
-        institution_assets = self.institution_types.get(institution_type, {}).get('typical_assets', [])
-        
         # Map threat types to affected assets
         threat_type = threat.get('custom_properties', {}).get('threat_type', '')
+        if threat_type in _AFFECTED_ASSETS:
+            return _AFFECTED_ASSETS[threat_type]
         
-        if threat_type == 'malware':
-            return ['core_banking', 'endpoints', 'file_servers']
-        elif threat_type == 'fraud':
-            return ['wire_transfer', 'online_banking', 'email_systems']
-        elif threat_type == 'vulnerability':
-            return ['web_applications', 'network_infrastructure']
-        else:
-            return institution_assets[:2]  # Return top 2 assets
+        institution_assets = self.institution_types.get(institution_type, {}).get('typical_assets', [])
+        return institution_assets[:2]  # Return top 2 assets
     
-    def _assess_compliance_impact(self, threat: Dict, frameworks: List[str]) -> Dict[str, Any]:
+    def _assess_compliance_impact(self, threat: Dict, frameworks: List[str]) -> Mapping[str, Any]:
         """Assess impact on compliance frameworks"""
-        impact = {}
+        reporting_required = threat.get('custom_properties', {}).get('severity') in ['critical', 'high']
         
-        for framework in frameworks:
-            if framework in self.compliance_frameworks:
-                impact[framework] = {
-                    'affected': True,
-                    'controls_to_review': self.compliance_frameworks[framework]['controls'],
-                    'reporting_required': threat.get('custom_properties', {}).get('severity') in ['critical', 'high']
-                }
+        key = (tuple(frameworks), reporting_required)
+        impact = self._compliance_impacts.get(key)
+        if impact is None:
+            impact = {}
+            for framework in frameworks:
+                if framework in self.compliance_frameworks:
+                    impact[framework] = {
+                        'affected': True,
+                        'controls_to_review': self.compliance_frameworks[framework]['controls'],
+                        'reporting_required': reporting_required
+                    }
+            # Frozen so no threat can edit the impact (or controls) of another
+            impact = self._compliance_impacts[key] = freeze(impact)
         
         return impact
     
-    def _assess_business_impact(self, threat: Dict, institution_type: str) -> Dict[str, Any]:
+    def _assess_business_impact(self, threat: Dict, institution_type: str) -> Mapping[str, Any]:
         """Assess business impact of threat"""
         severity = threat.get('custom_properties', {}).get('severity', 'medium')
-        
-        impact_levels = {
-            'critical': {
-                'operational': 'severe',
-                'financial': 'high',
-                'reputational': 'high',
-                'estimated_downtime_hours': 24
-            },
-            'high': {
-                'operational': 'moderate',
-                'financial': 'moderate',
-                'reputational': 'moderate',
-                'estimated_downtime_hours': 8
-            },
-            'medium': {
-                'operational': 'low',
-                'financial': 'low',
-                'reputational': 'low',
-                'estimated_downtime_hours': 2
-            }
-        }
-        
-        return impact_levels.get(severity, impact_levels['medium'])
+        return _IMPACT_LEVELS.get(severity, _IMPACT_LEVELS['medium'])
     
-    def _determine_regulatory_reporting(self, threat: Dict) -> Dict[str, Any]:
+    def _determine_regulatory_reporting(self, threat: Dict) -> Mapping[str, Any]:
         """Determine regulatory reporting requirements"""
         severity = threat.get('custom_properties', {}).get('severity', 'medium')
-        
-        reporting = {
-            'required': severity in ['critical', 'high'],
-            'agencies': [],
-            'timeframe_hours': 72
-        }
-        
-        if severity == 'critical':
-            reporting['agencies'] = ['NCUA', 'FCA', 'FinCEN', 'FBI']
-            reporting['timeframe_hours'] = 24
-        elif severity == 'high':
-            reporting['agencies'] = ['NCUA', 'FCA']
-            reporting['timeframe_hours'] = 72
-        
-        return reporting
+        return _REGULATORY_REPORTING.get(severity, _REGULATORY_REPORTING[None])
     
     def _calculate_mitigation_priority(self, threat: Dict, institution_type: str) -> int:
         """Calculate mitigation priority score (0-100)"""
@@ -180,27 +240,25 @@ class FinancialServicesAnalyzer:
         
         return min(int(base_score), 100)
     
-    def generate_compliance_report(self, threats: List[Dict]) -> Dict[str, Any]:
-        """Generate compliance-focused report"""
+    def generate_compliance_report(self, threats: Sequence[Dict],
+                                   aggregate: ThreatAggregate = None) -> Dict[str, Any]:
+        """Generate compliance-focused report
+        
+        Framework counts come from ``aggregate`` when given (for example one
+        merged across chunks or computed by ``ThreatStorage.aggregate``);
+        otherwise ``threats`` are aggregated in a single pass.
+        """
+        if aggregate is None:
+            unranked = threats.unordered() if isinstance(threats, RankedView) else threats
+            aggregate = ThreatAggregate.from_threats(unranked)
+        
         report = {
             'generated_at': datetime.now().isoformat(),
             'total_threats': len(threats),
-            'compliance_summary': {},
+            'compliance_summary': aggregate.compliance_summary(['FFIEC', 'FCA', 'GLBA']),
             'high_priority_items': []
         }
-        
-        # Summarize compliance impacts
-        for framework in ['FFIEC', 'FCA', 'GLBA']:
-            affected_threats = [
-                t for t in threats 
-                if framework in t.get('financial_services_analysis', {}).get('compliance_impact', {})
-            ]
-            report['compliance_summary'][framework] = {
-                'affected_threats': len(affected_threats),
-                'requires_action': len([t for t in affected_threats 
-                                       if t['financial_services_analysis']['compliance_impact'][framework].get('reporting_required')])
-            }
-        
+
         # Identify high-priority items
         for threat in threats[:5]:  # Top 5
             report['high_priority_items'].append({
@@ -232,39 +290,64 @@ class AgricultureAnalyzer:
                 'threats': ['connectivity_disruption', 'man_in_the_middle', 'signal_jamming']
             }
         }
+        
+        # Every description keyword check below is answered from one scan
+        self.keyword_matcher = shared_matcher
+        self._register_keywords()
     
+    def _register_keywords(self):
+        """Add the focus area keywords to the shared matcher"""
+        self.keyword_matcher.extend(
+            [t for area in self.focus_areas.values() for t in area['threats']]
+            + ['supply chain', 'iot', 'sensor']
+        )
+    
+    @metrics.timed('sector.agriculture')
     def analyze_threats(self, threat_data: List[Dict], 
-                       focus_areas: List[str] = None) -> List[Dict]:
-        """Analyze threats specific to agriculture sector"""
+                       focus_areas: List[str] = None,
+                       workers: int = None) -> List[Dict]:
+        """Analyze threats specific to agriculture sector
+        
+        With ``workers`` > 1 the relevant threats are analyzed in chunks on a
+        process pool; the result is the same as the serial path.
+        """
         logger.info("Analyzing threats for agriculture sector...")
         
         if focus_areas is None:
             focus_areas = ['supply_chain', 'iot_devices']
         
-        analyzed_threats = []
+        # Check if threat is relevant to agriculture
+        relevant = [t for t in threat_data if self._is_relevant_to_agriculture(t)]
         
-        for threat in threat_data:
-            # Check if threat is relevant to agriculture
-            if not self._is_relevant_to_agriculture(threat):
-                continue
-            
-            # Enrich with agriculture context
-            enriched_threat = {
-                **threat,
-                'agriculture_analysis': {
-                    'affected_areas': self._identify_affected_areas(threat, focus_areas),
-                    'supply_chain_impact': self._assess_supply_chain_impact(threat),
-                    'iot_vulnerability': self._assess_iot_vulnerability(threat),
-                    'rural_considerations': self._assess_rural_considerations(threat),
-                    'mitigation_challenges': self._identify_mitigation_challenges(threat)
-                }
-            }
-            
-            analyzed_threats.append(enriched_threat)
+        if workers and workers > 1:
+            analyses = map_chunks(
+                partial(_agriculture_chunk, focus_areas=focus_areas,
+                        focus_area_definitions=self.focus_areas),
+                [_agriculture_fields(t) for t in relevant],
+                workers=workers
+            )
+        else:
+            analyses = [self._analyze_threat(t, focus_areas) for t in relevant]
+        
+        # Enrich with agriculture context
+        analyzed_threats = [
+            enrich(threat, 'agriculture_analysis', analysis)
+            for threat, analysis in zip(relevant, analyses)
+        ]
         
         logger.info(f"Identified {len(analyzed_threats)} relevant threats for agriculture")
         return analyzed_threats
     
+    def _analyze_threat(self, threat: Dict, focus_areas: List[str]) -> Dict[str, Any]:
+        """Build the agriculture analysis of one threat"""
+        return {
+            'affected_areas': self._identify_affected_areas(threat, focus_areas),
+            'supply_chain_impact': self._assess_supply_chain_impact(threat),
+            'iot_vulnerability': self._assess_iot_vulnerability(threat),
+            'rural_considerations': self._assess_rural_considerations(threat),
+            'mitigation_challenges': self._identify_mitigation_challenges(threat)
+        }
+    
     def _is_relevant_to_agriculture(self, threat: Dict) -> bool:
         """Check if threat is relevant to agriculture"""
         sectors = threat.get('custom_properties', {}).get('sectors', [])
@@ -274,14 +357,14 @@ class AgricultureAnalyzer:
         """Identify which agriculture areas are affected"""
         affected = []
         
-        description = threat.get('description', '').lower()
+        hits = self.keyword_matcher.find(threat.get('description', ''))
         
         for area in focus_areas:
             area_info = self.focus_areas.get(area, {})
             area_threats = area_info.get('threats', [])
             
             # Check if threat matches area-specific threats
-            if any(t in description for t in area_threats):
+            if any(t in hits for t in area_threats):
                 affected.append(area)
         
         return affected if affected else focus_areas[:1]
@@ -289,43 +372,30 @@ class AgricultureAnalyzer:
     def _assess_supply_chain_impact(self, threat: Dict) -> Dict[str, Any]:
         """Assess impact on agricultural supply chain"""
         return {
-            'severity': 'high' if 'supply chain' in threat.get('description', '').lower() else 'medium',
-            'affected_stages': ['production', 'processing', 'distribution'],
+            'severity': 'high' if 'supply chain' in self.keyword_matcher.find(threat.get('description', '')) else 'medium',
+            'affected_stages': _SUPPLY_CHAIN_STAGES,
             'food_safety_risk': threat.get('custom_properties', {}).get('severity') == 'critical'
         }
     
     def _assess_iot_vulnerability(self, threat: Dict) -> Dict[str, Any]:
         """Assess IoT device vulnerability"""
-        description = threat.get('description', '').lower()
+        hits = self.keyword_matcher.find(threat.get('description', ''))
         
         return {
-            'iot_relevant': 'iot' in description or 'sensor' in description,
-            'device_types_at_risk': ['sensors', 'automated_equipment', 'monitoring_systems'],
+            'iot_relevant': 'iot' in hits or 'sensor' in hits,
+            'device_types_at_risk': _IOT_DEVICE_TYPES,
             'patching_difficulty': 'high'  # IoT devices often difficult to patch
         }
     
-    def _assess_rural_considerations(self, threat: Dict) -> Dict[str, Any]:
+    def _assess_rural_considerations(self, threat: Dict) -> Mapping[str, Any]:
         """Assess rural-specific considerations"""
-        return {
-            'limited_connectivity': True,
-            'remote_locations': True,
-            'limited_it_resources': True,
-            'response_challenges': ['geographic_dispersion', 'limited_bandwidth', 'staff_availability']
-        }
+        return _RURAL_CONSIDERATIONS
     
-    def _identify_mitigation_challenges(self, threat: Dict) -> List[str]:
+    def _identify_mitigation_challenges(self, threat: Dict) -> Sequence[str]:
         """Identify agriculture-specific mitigation challenges"""
-        challenges = [
-            'Limited IT staff in rural areas',
-            'Difficulty patching IoT devices in the field',
-            'Seasonal operational constraints',
-            'Legacy equipment compatibility'
-        ]
-        
-        if 'iot' in threat.get('description', '').lower():
-            challenges.append('IoT device lifecycle management')
-        
-        return challenges
+        if 'iot' in self.keyword_matcher.find(threat.get('description', '')):
+            return _IOT_MITIGATION_CHALLENGES
+        return _MITIGATION_CHALLENGES
     
     def filter_iot_threats(self, threats: List[Dict]) -> List[Dict]:
         """Filter threats specifically affecting IoT devices"""
@@ -335,14 +405,63 @@ class AgricultureAnalyzer:
         ]
 
 
+def _mitigation_priority_key(threat: Dict) -> int:
+    """Ranking key for financial services analysis results"""
+    return threat['financial_services_analysis']['mitigation_priority']
+
+
+def _financial_services_fields(threat: Dict) -> Dict:
+    """Project a threat onto the fields FinancialServicesAnalyzer reads"""
+    props = threat.get('custom_properties', {})
+    return {
+        'custom_properties': {
+            key: props[key] for key in ('severity', 'threat_type') if key in props
+        },
+        'analysis': {
+            key: value for key, value in threat.get('analysis', {}).items()
+            if key == 'risk_score'
+        }
+    }
+
+
+def _financial_services_chunk(threats: List[Dict], institution_type: str,
+                              compliance_frameworks: List[str],
+                              framework_definitions: Dict,
+                              institution_types: Dict) -> List[Dict]:
+    """Process-pool worker: return the financial services analysis of a chunk"""
+    analyzer = FinancialServicesAnalyzer()
+    analyzer.compliance_frameworks = framework_definitions
+    analyzer.institution_types = institution_types
+    
+    return [analyzer._analyze_threat(t, institution_type, compliance_frameworks) for t in threats]
+
+
+def _agriculture_fields(threat: Dict) -> Dict:
+    """Project a threat onto the fields AgricultureAnalyzer reads"""
+    props = threat.get('custom_properties', {})
+    return {
+        'description': threat.get('description', ''),
+        'custom_properties': {
+            key: props[key] for key in ('severity',) if key in props
+        }
+    }
+
+
+def _agriculture_chunk(threats: List[Dict], focus_areas: List[str],
+                       focus_area_definitions: Dict) -> List[Dict]:
+    """Process-pool worker: return the agriculture analysis of a chunk"""
+    analyzer = AgricultureAnalyzer()
+    analyzer.focus_areas = focus_area_definitions
+    analyzer._register_keywords()
+    
+    return [analyzer._analyze_threat(t, focus_areas) for t in threats]
+
+
 def main():
     """Main execution function"""
-    import json
-    
     # Load analyzed threats
     try:
-        with open('data/analyzed_threats.json', 'r') as f:
-            threats = json.load(f)
+        threats = read_threats('data/analyzed_threats.json')
     except FileNotFoundError:
         logger.error("No analyzed threats found. Run threat_analyzer.py first.")
         return
@@ -3,22 +3,73 @@ Threat Intelligence Analyzer
 AI/ML-powered threat analysis, classification, and prioritization
 """
 
-import json
 import logging
-from typing import List, Dict, Any
-from datetime import datetime
-from collections import defaultdict
+from functools import lru_cache, partial
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Sequence, Tuple
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # Batch scoring falls back to the scalar path
+    np = None
+
+try:
+    from .threat_io import iter_threat_file, write_threats
+    from .threat_storage import ThreatStorage
+    from .keyword_matcher import shared_matcher
+    from .parallel import map_chunks
+    from .ranking import RankedView, top_k
+    from .attack_mapping import DEFAULT_MAPPING_PATH, load_attack_mapping
+    from .threat_record import enrich, freeze
+    from .aggregates import ThreatAggregate
+    from .events import ALERT_PRIORITIES
+    from .metrics import metrics
+except ImportError:
+    from threat_io import iter_threat_file, write_threats
+    from threat_storage import ThreatStorage
+    from keyword_matcher import shared_matcher
+    from parallel import map_chunks
+    from ranking import RankedView, top_k
+    from attack_mapping import DEFAULT_MAPPING_PATH, load_attack_mapping
+    from threat_record import enrich, freeze
+    from aggregates import ThreatAggregate
+    from events import ALERT_PRIORITIES
+    from metrics import metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECONDS_PER_DAY = 86400 * 10**6
+
+
+def _risk_score_key(threat: Dict) -> float:
+    """Ranking key for analyzed threats"""
+    return threat['analysis']['risk_score']
+
 
 class ThreatAnalyzer:
     """Analyzes and prioritizes threats using AI/ML techniques"""
     
-    def __init__(self):
+    def __init__(self, batch_size: int = 1000, template_cache_size: int = 4096,
+                 attack_mapping_path: str = DEFAULT_MAPPING_PATH):
         """Initialize threat analyzer"""
         self.analyzed_threats = []
+        self.batch_size = batch_size
+        
+        # TTP -> parent technique, tactics, vectors and categories
+        self.attack_mapping_path = attack_mapping_path
+        self.attack_mapping = load_attack_mapping(attack_mapping_path)
+        
+        # Classification and recommendations depend only on the threat signature
+        self._templates = lru_cache(maxsize=template_cache_size)(self._build_templates)
+        
+        # Previous analyses for incremental runs: id -> (modified, sector, analysis)
+        self.analysis_cache = {}
+        
+        # Called with each newly analyzed threat whose priority is in ALERT_PRIORITIES
+        self.listeners: List[Callable[[Dict], None]] = []
         
         # Threat scoring weights
         self.scoring_weights = {
@@ -40,48 +91,394 @@ class ThreatAnalyzer:
                 'critical_keywords': ['iot', 'supply chain', 'scada', 'operational technology']
             }
         }
+        
+        # Keyword matching shares one automaton (and hit cache) with the sector analyzers
+        self.keyword_matcher = shared_matcher
+        self._register_keywords()
+    
+    def _register_keywords(self):
+        """Add the sector keywords to the shared matcher"""
+        self.keyword_matcher.extend(
+            kw for patterns in self.sector_patterns.values()
+            for kw in patterns.get('critical_keywords', [])
+        )
     
-    def analyze(self, threats: List[Dict], sector: str = None) -> List[Dict]:
-        """Analyze threats and calculate risk scores"""
-        logger.info(f"Analyzing {len(threats)} threats...")
+    @metrics.timed('analyzer.analyze')
+    def analyze(self, threats: Iterable[Dict], sector: str = None,
+                workers: int = None, incremental: bool = False) -> Sequence[Dict]:
+        """Analyze threats and calculate risk scores
+        
+        The result is ordered by risk score (highest first) but only sorted
+        as far as it is read, so taking the top few threats stays cheap.
+        With ``workers`` > 1 the threats are analyzed in chunks on a process
+        pool; the result is the same as the serial path. With
+        ``incremental``, unchanged threats reuse their previous analysis
+        (see ``_analyze_incremental``).
+        """
+        if isinstance(threats, list):
+            logger.info(f"Analyzing {len(threats)} threats...")
+        templates_before = self._templates.cache_info() if metrics.enabled else None
+        
+        if incremental:
+            analyzed = self._analyze_incremental(threats, sector, workers)
+        else:
+            analyzed = self._analyze_all(threats, sector, workers)
+        
+        if templates_before is not None:
+            templates_after = self._templates.cache_info()
+            metrics.count('analyzer.template_cache.hits', templates_after.hits - templates_before.hits)
+            metrics.count('analyzer.template_cache.misses', templates_after.misses - templates_before.misses)
+        
+        # Rank by risk score (highest first)
+        analyzed = RankedView(analyzed, key=_risk_score_key)
         
-        analyzed = []
+        self.analyzed_threats = analyzed
+        logger.info(f"Analysis complete. {len(analyzed)} threats analyzed.")
         
-        for threat in threats:
-            # Calculate risk score
-            risk_score = self._calculate_risk_score(threat, sector)
+        return analyzed
+    
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """Call ``listener`` with every newly analyzed critical or high priority threat
+        
+        Listeners run on the analyzing thread as each threat is analyzed, so
+        they should hand the threat off (for example to an ``EventBroker``)
+        rather than block. Threats reusing a cached analysis are not passed.
+        """
+        self.listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[Dict], None]):
+        """Stop calling ``listener``"""
+        self.listeners.remove(listener)
+    
+    def _alert(self, analyzed: Iterable[Dict]) -> Iterable[Dict]:
+        """Pass analyzed threats through, handing alert-worthy ones to the listeners"""
+        if not self.listeners:
+            return analyzed
+        return self._iter_alert(analyzed)
+    
+    def _iter_alert(self, analyzed: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield analyzed threats, calling the listeners for alert priorities"""
+        for threat in analyzed:
+            if threat['analysis']['priority'] in ALERT_PRIORITIES:
+                for listener in list(self.listeners):
+                    try:
+                        listener(threat)
+                    except Exception as e:
+                        logger.error(f"Threat listener failed: {e}")
+            yield threat
+    
+    def _analyze_all(self, threats: Iterable[Dict], sector: str = None,
+                     workers: int = None) -> List[Dict]:
+        """Fully analyze every threat, in input order"""
+        if workers and workers > 1:
+            threats = list(threats)
+            analyses = map_chunks(
+                partial(_analyze_chunk, sector=sector,
+                        scoring_weights=self.scoring_weights,
+                        sector_patterns=self.sector_patterns,
+                        attack_mapping_path=self.attack_mapping_path),
+                [_analysis_fields(t) for t in threats],
+                workers=workers
+            )
+            return list(self._alert(enrich(t, 'analysis', a) for t, a in zip(threats, analyses)))
+        
+        return list(self._alert(self.iter_analyze(threats, sector)))
+    
+    def _analyze_incremental(self, threats: Iterable[Dict], sector: str = None,
+                             workers: int = None) -> List[Dict]:
+        """Analyze only new or modified threats, reusing cached analyses
+        
+        A threat whose id, ``modified`` and sector match ``analysis_cache``
+        keeps its previous analysis. Recency is the only time-dependent
+        input, so the risk score and priority are recomputed only when the
+        threat has crossed a recency bucket since it was last analyzed.
+        """
+        threats = list(threats)
+        now = datetime.now()
+        
+        analyzed = [None] * len(threats)
+        stale = []
+        refreshed = 0
+        
+        for i, threat in enumerate(threats):
+            cached = self.analysis_cache.get(threat.get('id'))
+            if cached is None or cached[0] != threat.get('modified') or cached[1] != sector:
+                stale.append(i)
+                continue
+            
+            analysis = cached[2]
+            if self._recency_bucket_changed(threat, analysis, now):
+                analysis = self._refresh_recency(threat, analysis, now)
+                refreshed += 1
             
-            # Classify threat
-            classification = self._classify_threat(threat, sector)
+            analyzed[i] = enrich(threat, 'analysis', analysis)
+        
+        fresh = self._analyze_all([threats[i] for i in stale], sector, workers)
+        for i, threat in zip(stale, fresh):
+            analyzed[i] = threat
+        
+        metrics.count('analyzer.analysis_cache.hits', len(threats) - len(stale))
+        metrics.count('analyzer.analysis_cache.misses', len(stale))
+        logger.info(f"Incremental analysis: {len(stale)} analyzed, {refreshed} rescored for recency, "
+                    f"{len(threats) - len(stale) - refreshed} reused")
+        
+        # Keep the cache in step with the current corpus so removed threats are dropped
+        self.analysis_cache = {}
+        self.seed_analysis_cache(analyzed, sector)
+        
+        return analyzed
+    
+    def seed_analysis_cache(self, analyzed_threats: Iterable[Dict], sector: str = None):
+        """Remember previously analyzed threats for incremental runs
+        
+        ``analyzed_threats`` may come from an earlier ``analyze`` call, a
+        saved analysis file or storage; ``sector`` is the sector they were
+        analyzed for.
+        """
+        for threat in analyzed_threats:
+            if threat.get('id') and 'analysis' in threat:
+                self.analysis_cache[threat['id']] = (threat.get('modified'), sector, threat['analysis'])
+    
+    def _recency_bucket_changed(self, threat: Dict, analysis: Dict, now: datetime) -> bool:
+        """Whether a threat's recency score differs from when it was analyzed"""
+        try:
+            analyzed_at = datetime.fromisoformat(analysis['analyzed_at'])
+        except (KeyError, ValueError, TypeError):
+            return True
+        
+        return self._calculate_recency_score(threat, analyzed_at) != self._calculate_recency_score(threat, now)
+    
+    def _refresh_recency(self, threat: Dict, analysis: Dict, now: datetime) -> Dict[str, Any]:
+        """Recompute risk score and priority of a cached analysis for the current recency"""
+        scores = self._component_scores(threat, analysis['sector_relevance'], now)
+        risk_score = self._weighted_risk_score(scores)
+        
+        return {
+            **analysis,
+            'risk_score': risk_score,
+            'priority': self._get_priority(risk_score),
+            'analyzed_at': now.isoformat()
+        }
+    
+    def iter_analyze(self, threats: Iterable[Dict], sector: str = None) -> Iterator[Dict]:
+        """Yield each threat enriched with its analysis, in input order
+        
+        Unlike ``analyze`` this neither sorts nor keeps the results, so a
+        stream of threats can be analyzed and saved with bounded memory.
+        """
+        threats = iter(threats)
+        
+        # Score in batches so the vectorized path is used without materializing the input
+        while True:
+            batch = list(islice(threats, self.batch_size))
+            if not batch:
+                break
             
-            # Generate recommendations
-            recommendations = self._generate_recommendations(threat, sector)
+            risk_scores, priorities, relevances = self._score_batch(batch, sector)
             
-            # Enrich threat data
-            analyzed_threat = {
-                **threat,
-                'analysis': {
+            for threat, risk_score, priority, relevance in zip(batch, risk_scores, priorities, relevances):
+                # Classification and recommendations are shared per threat signature
+                classification, recommendations = self._templates(self._threat_signature(threat, sector))
+                
+                # Enrich threat data
+                yield enrich(threat, 'analysis', {
                     'risk_score': risk_score,
-                    'priority': self._get_priority(risk_score),
+                    'priority': priority,
                     'classification': classification,
                     'recommendations': recommendations,
                     'analyzed_at': datetime.now().isoformat(),
-                    'sector_relevance': self._calculate_sector_relevance(threat, sector)
-                }
-            }
-            
-            analyzed.append(analyzed_threat)
+                    'sector_relevance': relevance
+                })
+    
+    @metrics.timed('analyzer.analyze_sectors')
+    def analyze_sectors(self, threats: Iterable[Dict], sectors: List[str],
+                        workers: int = None, incremental: bool = False) -> Sequence[Dict]:
+        """Analyze threats for several sectors in one pass
+        
+        Severity, confidence, recency and IOC score are computed once per
+        threat; classification and recommendations come from the template cache.
+        Each threat's ``analysis`` holds one result per sector under
+        ``sectors``; its top-level fields repeat the highest-risk sector's
+        result (named by ``primary_sector``) so existing consumers keep working.
+        
+        As with ``analyze``, the result is ranked by risk score, ``workers``
+        > 1 analyzes chunks on a process pool and listeners are called for
+        alert priorities. ``incremental`` is not supported: the analysis
+        cache holds one sector per threat, so it raises ``ValueError``.
+        """
+        if incremental:
+            raise ValueError("Incremental analysis covers one sector; use analyze() per sector")
+        
+        if workers and workers > 1:
+            threats = list(threats)
+            analyses = map_chunks(
+                partial(_analyze_sectors_chunk, sectors=sectors,
+                        scoring_weights=self.scoring_weights,
+                        sector_patterns=self.sector_patterns,
+                        attack_mapping_path=self.attack_mapping_path),
+                [_analysis_fields(t) for t in threats],
+                workers=workers
+            )
+            analyzed = (enrich(t, 'analysis', a) for t, a in zip(threats, analyses))
+        else:
+            analyzed = self._iter_analyze_sectors(threats, sectors)
         
-        # Sort by risk score (highest first)
-        analyzed.sort(key=lambda x: x['analysis']['risk_score'], reverse=True)
+        analyzed = RankedView(list(self._alert(analyzed)), key=_risk_score_key)
         
         self.analyzed_threats = analyzed
-        logger.info(f"Analysis complete. {len(analyzed)} threats analyzed.")
+        logger.info(f"Analysis complete. {len(analyzed)} threats analyzed for {len(sectors)} sectors.")
         
         return analyzed
     
+    def _iter_analyze_sectors(self, threats: Iterable[Dict], sectors: List[str]) -> Iterator[Dict]:
+        """Yield each threat enriched with its multi-sector analysis, in input order"""
+        threats = iter(threats)
+        
+        while True:
+            batch = list(islice(threats, self.batch_size))
+            if not batch:
+                break
+            
+            base_columns = self._base_score_columns(batch) if np is not None else None
+            per_sector = {}
+            for sector in sectors:
+                relevances = [self._calculate_sector_relevance(t, sector) for t in batch]
+                if base_columns is not None:
+                    risk_scores, priorities = self._combine_scores(base_columns, relevances)
+                else:
+                    risk_scores = [self._calculate_risk_score(t, sector) for t in batch]
+                    priorities = [self._get_priority(r) for r in risk_scores]
+                per_sector[sector] = (risk_scores, priorities, relevances)
+            
+            for i, threat in enumerate(batch):
+                analyzed_at = datetime.now().isoformat()
+                
+                results = {}
+                for sector in sectors:
+                    risk_scores, priorities, relevances = per_sector[sector]
+                    classification, recommendations = self._templates(self._threat_signature(threat, sector))
+                    results[sector] = {
+                        'risk_score': risk_scores[i],
+                        'priority': priorities[i],
+                        'classification': classification,
+                        'recommendations': recommendations,
+                        'analyzed_at': analyzed_at,
+                        'sector_relevance': relevances[i]
+                    }
+                
+                primary = max(sectors, key=lambda s: results[s]['risk_score'])
+                yield enrich(threat, 'analysis', {
+                    **results[primary],
+                    'primary_sector': primary,
+                    'sectors': results
+                })
+    
+    def score_batch(self, threats: Sequence[Dict], sector: str = None) -> Tuple[List[float], List[str]]:
+        """Calculate risk scores and priorities for many threats at once
+        
+        Gives the same results as ``_calculate_risk_score`` and
+        ``_get_priority`` applied to each threat.
+        """
+        risk_scores, priorities, _ = self._score_batch(threats, sector)
+        return risk_scores, priorities
+    
+    def _score_batch(self, threats: Sequence[Dict],
+                     sector: str = None) -> Tuple[List[float], List[str], List[float]]:
+        """Score a batch, returning risk scores, priorities and sector relevance
+        
+        Per-threat fields are extracted into columns once; bucketing, the
+        weighted sum and priority thresholds then run as array operations.
+        """
+        relevances = [self._calculate_sector_relevance(t, sector) for t in threats]
+        
+        if np is None:
+            risk_scores = [self._calculate_risk_score(t, sector) for t in threats]
+            return risk_scores, [self._get_priority(r) for r in risk_scores], relevances
+        
+        risk_scores, priorities = self._combine_scores(self._base_score_columns(threats), relevances)
+        return risk_scores, priorities, relevances
+    
+    def _base_score_columns(self, threats: Sequence[Dict]) -> Dict[str, Any]:
+        """Extract the sector-independent score columns of a batch"""
+        severity_map = {'critical': 100, 'high': 75, 'medium': 50, 'low': 25}
+        now = (datetime.now() - _EPOCH) // timedelta(microseconds=1)
+        
+        severity = np.empty(len(threats))
+        confidence = np.empty(len(threats))
+        created = np.zeros(len(threats), dtype=np.int64)
+        created_valid = np.ones(len(threats), dtype=bool)
+        ioc_count = np.empty(len(threats), dtype=np.int64)
+        
+        for i, threat in enumerate(threats):
+            props = threat.get('custom_properties', {})
+            severity[i] = severity_map.get(props.get('severity', 'medium'), 50)
+            confidence[i] = threat.get('confidence', 60)
+            ioc_count[i] = sum(
+                len(v) if isinstance(v, list) else 1
+                for v in props.get('iocs', {}).values()
+            )
+            try:
+                timestamp = datetime.fromisoformat(threat.get('created', '').replace('Z', '+00:00'))
+                created[i] = (timestamp.replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1)
+            except (ValueError, TypeError, AttributeError, OverflowError):
+                created_valid[i] = False
+        
+        # Floor division matches timedelta.days for negative ages too
+        age_days = (now - created) // _MICROSECONDS_PER_DAY
+        recency = np.select(
+            [age_days <= 1, age_days <= 7, age_days <= 30, age_days <= 90],
+            [100.0, 80.0, 60.0, 40.0],
+            20.0
+        )
+        recency[~created_valid] = 50.0
+        
+        ioc_score = np.select(
+            [ioc_count >= 10, ioc_count >= 5, ioc_count >= 3, ioc_count >= 1],
+            [100.0, 75.0, 50.0, 25.0],
+            0.0
+        )
+        
+        return {
+            'severity': severity,
+            'confidence': confidence,
+            'recency': recency,
+            'ioc_count': ioc_score
+        }
+    
+    def _combine_scores(self, base_columns: Dict[str, Any],
+                        relevances: List[float]) -> Tuple[List[float], List[str]]:
+        """Weight base columns and sector relevance into risk scores and priorities"""
+        columns = {
+            'severity': base_columns['severity'],
+            'confidence': base_columns['confidence'],
+            'sector_relevance': np.array(relevances, dtype=float),
+            'recency': base_columns['recency'],
+            'ioc_count': base_columns['ioc_count']
+        }
+        
+        # Accumulate in the scalar path's order so every float matches exactly
+        weighted = np.zeros(len(relevances))
+        for key, column in columns.items():
+            weighted += column * self.scoring_weights[key]
+        
+        risk_scores = [round(score, 2) for score in weighted.tolist()]
+        rounded = np.array(risk_scores)
+        priorities = np.select(
+            [rounded >= 80, rounded >= 60, rounded >= 40],
+            ['critical', 'high', 'medium'],
+            'low'
+        ).tolist()
+        
+        return risk_scores, priorities
+    
     def _calculate_risk_score(self, threat: Dict, sector: str = None) -> float:
         """Calculate overall risk score (0-100)"""
+        scores = self._component_scores(threat, self._calculate_sector_relevance(threat, sector))
+        return self._weighted_risk_score(scores)
+    
+    def _component_scores(self, threat: Dict, sector_relevance: float,
+                          now: datetime = None) -> Dict[str, float]:
+        """Per-factor scores of a threat, in weighting order"""
         scores = {}
         
         # Severity score
@@ -93,14 +490,18 @@ class ThreatAnalyzer:
         scores['confidence'] = threat.get('confidence', 60)
         
         # Sector relevance score
-        scores['sector_relevance'] = self._calculate_sector_relevance(threat, sector)
+        scores['sector_relevance'] = sector_relevance
         
         # Recency score (newer threats score higher)
-        scores['recency'] = self._calculate_recency_score(threat)
+        scores['recency'] = self._calculate_recency_score(threat, now)
         
         # IOC count score (more indicators = higher confidence)
         scores['ioc_count'] = self._calculate_ioc_score(threat)
         
+        return scores
+    
+    def _weighted_risk_score(self, scores: Dict[str, float]) -> float:
+        """Combine component scores into the overall risk score"""
         # Calculate weighted average
         risk_score = sum(
             scores[key] * self.scoring_weights[key] 
@@ -121,29 +522,28 @@ class ThreatAnalyzer:
         if sector in threat_sectors:
             relevance_score += 50.0
         
-        # Check for sector-specific TTPs
+        # Check for sector-specific TTPs, including their sub-techniques
         threat_ttps = threat.get('custom_properties', {}).get('ttps', [])
         sector_ttps = self.sector_patterns.get(sector, {}).get('high_risk_ttps', [])
         
-        matching_ttps = set(threat_ttps) & set(sector_ttps)
-        if matching_ttps:
+        if self.attack_mapping.matches_any(threat_ttps, sector_ttps):
             relevance_score += 30.0
         
         # Check for sector-specific keywords
-        description = threat.get('description', '').lower()
+        hits = self.keyword_matcher.find(threat.get('description', ''))
         keywords = self.sector_patterns.get(sector, {}).get('critical_keywords', [])
         
-        matching_keywords = [kw for kw in keywords if kw in description]
+        matching_keywords = [kw for kw in keywords if kw in hits]
         if matching_keywords:
             relevance_score += 20.0
         
         return min(relevance_score, 100.0)
     
-    def _calculate_recency_score(self, threat: Dict) -> float:
-        """Calculate score based on threat recency"""
+    def _calculate_recency_score(self, threat: Dict, now: datetime = None) -> float:
+        """Calculate score based on threat recency (as of ``now``)"""
         try:
             created = datetime.fromisoformat(threat.get('created', '').replace('Z', '+00:00'))
-            age_days = (datetime.now() - created.replace(tzinfo=None)).days
+            age_days = ((now or datetime.now()) - created.replace(tzinfo=None)).days
             
             # Newer threats score higher
             if age_days <= 1:
@@ -181,23 +581,49 @@ class ThreatAnalyzer:
             return 0.0
     
     def _classify_threat(self, threat: Dict, sector: str = None) -> Dict[str, Any]:
-        """Classify threat into categories"""
-        threat_type = threat.get('custom_properties', {}).get('threat_type', 'unknown')
-        ttps = threat.get('custom_properties', {}).get('ttps', [])
-        
-        classification = {
+        """Classify threat into categories (shared per signature; do not modify)"""
+        classification, _ = self._templates(self._threat_signature(threat, sector))
+        return classification
+    
+    def _threat_signature(self, threat: Dict, sector: str = None) -> Tuple:
+        """The fields classification and recommendations depend on"""
+        props = threat.get('custom_properties', {})
+        return (props.get('severity'), props.get('threat_type'), tuple(props.get('ttps', ())), sector)
+    
+    def _build_templates(self, signature: Tuple) -> Tuple[Dict[str, Any], Tuple[str, ...]]:
+        """Build the classification and recommendations shared by one signature
+        
+        Called through the ``_templates`` LRU cache, so threats with the same
+        severity, type, TTPs and sector share one result; it is frozen
+        (``MappingProxyType`` and tuples) so no threat can change another's.
+        """
+        severity, threat_type, ttps, sector = signature
+        props = {'ttps': list(ttps)}
+        if severity is not None:
+            props['severity'] = severity
+        if threat_type is not None:
+            props['threat_type'] = threat_type
+        threat = {'custom_properties': props}
+        
+        threat_type = props.get('threat_type', 'unknown')
+        classification = freeze({
             'type': threat_type,
-            'category': self._get_threat_category(threat_type, ttps),
-            'attack_vectors': self._identify_attack_vectors(ttps),
+            'category': self._get_threat_category(threat_type, props['ttps']),
+            'attack_vectors': self._identify_attack_vectors(props['ttps']),
             'target_assets': self._identify_target_assets(threat, sector)
-        }
+        })
+        recommendations = tuple(
+            self._base_recommendations(threat)
+            + self._sector_recommendations(sector)
+            + self._general_recommendations()
+        )
         
-        return classification
+        return classification, recommendations
     
     def _get_threat_category(self, threat_type: str, ttps: List[str]) -> str:
         """Determine threat category"""
         if threat_type == 'malware':
-            if any(ttp.startswith('T1486') for ttp in ttps):
+            if self.attack_mapping.has_category(ttps, 'ransomware'):
                 return 'ransomware'
             return 'malware'
         elif threat_type == 'fraud':
@@ -209,22 +635,7 @@ class ThreatAnalyzer:
     
     def _identify_attack_vectors(self, ttps: List[str]) -> List[str]:
         """Identify attack vectors from TTPs"""
-        vectors = []
-        
-        vector_mapping = {
-            'T1566': 'phishing',
-            'T1190': 'exploit_public_facing',
-            'T1078': 'valid_accounts',
-            'T1110': 'brute_force',
-            'T1200': 'hardware_additions'
-        }
-        
-        for ttp in ttps:
-            for key, vector in vector_mapping.items():
-                if ttp.startswith(key):
-                    vectors.append(vector)
-        
-        return vectors
+        return self.attack_mapping.vectors(ttps)
     
     def _identify_target_assets(self, threat: Dict, sector: str = None) -> List[str]:
         """Identify likely target assets"""
@@ -239,8 +650,13 @@ class ThreatAnalyzer:
         
         return assets
     
-    def _generate_recommendations(self, threat: Dict, sector: str = None) -> List[str]:
+    def _generate_recommendations(self, threat: Dict, sector: str = None) -> Tuple[str, ...]:
         """Generate actionable recommendations"""
+        _, recommendations = self._templates(self._threat_signature(threat, sector))
+        return recommendations
+    
+    def _base_recommendations(self, threat: Dict) -> List[str]:
+        """Recommendations driven by severity and threat type"""
         recommendations = []
         
         severity = threat.get('custom_properties', {}).get('severity', 'medium')
@@ -252,13 +668,13 @@ class ThreatAnalyzer:
             recommendations.append("IMMEDIATE ACTION REQUIRED: Activate incident response team")
             recommendations.append("Implement emergency blocking of known IOCs")
         
-        # Threat type-specific recommendations
-        if threat_type == 'malware' or 'T1486' in ttps:
+        # Threat type-specific recommendations; TTPs match sub-techniques too
+        if threat_type == 'malware' or self.attack_mapping.matches_any(ttps, ('T1486',)):
             recommendations.append("Verify backup integrity and offline backup availability")
             recommendations.append("Review and test ransomware response procedures")
             recommendations.append("Implement network segmentation to limit lateral movement")
         
-        if threat_type == 'fraud' or 'T1566' in ttps:
+        if threat_type == 'fraud' or self.attack_mapping.matches_any(ttps, ('T1566',)):
             recommendations.append("Conduct phishing awareness training for staff")
             recommendations.append("Implement email authentication (SPF, DKIM, DMARC)")
             recommendations.append("Review wire transfer authorization procedures")
@@ -268,7 +684,12 @@ class ThreatAnalyzer:
             recommendations.append("Apply security patches immediately")
             recommendations.append("Implement compensating controls if patching not possible")
         
-        # Sector-specific recommendations
+        return recommendations
+    
+    def _sector_recommendations(self, sector: str = None) -> List[str]:
+        """Sector-specific recommendations"""
+        recommendations = []
+        
         if sector == 'financial_services':
             recommendations.append("Review FFIEC Cybersecurity Assessment Tool controls")
             recommendations.append("Notify FS-ISAC of threat indicators")
@@ -277,12 +698,15 @@ class ThreatAnalyzer:
             recommendations.append("Review IoT device security configurations")
             recommendations.append("Assess supply chain partner security posture")
         
-        # General recommendations
-        recommendations.append("Update SIEM correlation rules with new IOCs")
-        recommendations.append("Document threat in incident tracking system")
-        
         return recommendations
     
+    def _general_recommendations(self) -> List[str]:
+        """Recommendations that apply to every threat"""
+        return [
+            "Update SIEM correlation rules with new IOCs",
+            "Document threat in incident tracking system"
+        ]
+    
     def _get_priority(self, risk_score: float) -> str:
         """Determine priority level from risk score"""
         if risk_score >= 80:
@@ -294,80 +718,175 @@ class ThreatAnalyzer:
         else:
             return 'low'
     
-    def get_threats_by_priority(self, priority: str) -> List[Dict]:
-        """Filter threats by priority level"""
-        return [
-            t for t in self.analyzed_threats 
-            if t['analysis']['priority'] == priority
-        ]
+    def get_threats_by_priority(self, priority: str) -> Sequence[Dict]:
+        """Filter threats by priority level, highest risk first"""
+        return RankedView(
+            [t for t in self._unranked_threats() if t['analysis']['priority'] == priority],
+            key=_risk_score_key
+        )
+    
+    def get_top_threats(self, k: int, priority: str = None) -> List[Dict]:
+        """Return the ``k`` highest-risk analyzed threats without a full sort"""
+        threats = self._unranked_threats()
+        if priority is not None:
+            threats = (t for t in threats if t['analysis']['priority'] == priority)
+        return top_k(threats, k, key=_risk_score_key)
+    
+    def _unranked_threats(self) -> Sequence[Dict]:
+        """Analyzed threats in whatever order is cheapest to read"""
+        if isinstance(self.analyzed_threats, RankedView):
+            return self.analyzed_threats.unordered()
+        return self.analyzed_threats
     
     def generate_summary_report(self) -> Dict[str, Any]:
         """Generate summary report of analyzed threats"""
         if not self.analyzed_threats:
             return {}
         
-        priority_counts = defaultdict(int)
-        sector_counts = defaultdict(int)
-        type_counts = defaultdict(int)
-        
-        for threat in self.analyzed_threats:
-            priority = threat['analysis']['priority']
-            priority_counts[priority] += 1
-            
-            sectors = threat.get('custom_properties', {}).get('sectors', [])
-            for sector in sectors:
-                sector_counts[sector] += 1
-            
-            threat_type = threat.get('custom_properties', {}).get('threat_type', 'unknown')
-            type_counts[threat_type] += 1
-        
-        avg_risk_score = sum(
-            t['analysis']['risk_score'] for t in self.analyzed_threats
-        ) / len(self.analyzed_threats)
+        # One pass over the threats for every counter and the average
+        aggregate = ThreatAggregate.from_threats(self._unranked_threats())
         
         return {
-            'total_threats': len(self.analyzed_threats),
-            'average_risk_score': round(avg_risk_score, 2),
-            'priority_distribution': dict(priority_counts),
-            'sector_distribution': dict(sector_counts),
-            'type_distribution': dict(type_counts),
-            'critical_threats': len(self.get_threats_by_priority('critical')),
-            'high_threats': len(self.get_threats_by_priority('high')),
+            'total_threats': aggregate.total,
+            'average_risk_score': round(aggregate.average_risk_score, 2),
+            'priority_distribution': dict(aggregate.priorities),
+            'sector_distribution': dict(aggregate.sectors),
+            'type_distribution': dict(aggregate.types),
+            'critical_threats': aggregate.priorities['critical'],
+            'high_threats': aggregate.priorities['high'],
             'generated_at': datetime.now().isoformat()
         }
     
-    def save_analysis(self, output_path: str = 'data/analyzed_threats.json'):
-        """Save analyzed threats to file"""
-        from pathlib import Path
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    def save_analysis(self, output_path: str = 'data/analyzed_threats.json',
+                      threats: Iterable[Dict] = None) -> int:
+        """Save analyzed threats to file
+        
+        ``threats`` may be any iterable, such as ``iter_analyze()``, and is
+        written as it is consumed. Defaults to the last ``analyze`` result.
+        The format follows the file name, as for ``write_threats``.
+        """
+        if threats is None:
+            threats = self.analyzed_threats
         
-        with open(output_path, 'w') as f:
-            json.dump(self.analyzed_threats, f, indent=2)
+        count = write_threats(output_path, threats)
+        
+        logger.info(f"Saved {count} analyzed threats to {output_path}")
+        return count
+    
+    def store_analysis(self, storage: ThreatStorage, threats: Iterable[Dict] = None) -> int:
+        """Upsert analyzed threats into a storage database
         
-        logger.info(f"Saved {len(self.analyzed_threats)} analyzed threats to {output_path}")
+        Defaults to the last ``analyze`` result.
+        """
+        if threats is None:
+            threats = self._unranked_threats()
+        
+        return storage.upsert_many(threats)
+
+
+def _analysis_fields(threat: Dict) -> Dict:
+    """Project a threat onto the fields ThreatAnalyzer reads"""
+    props = threat.get('custom_properties', {})
+    return {
+        'description': threat.get('description', ''),
+        'confidence': threat.get('confidence', 60),
+        'created': threat.get('created', ''),
+        'custom_properties': {
+            key: props[key]
+            for key in ('severity', 'threat_type', 'sectors', 'ttps', 'iocs')
+            if key in props
+        }
+    }
+
+
+def _analyze_chunk(threats: List[Dict], sector: str = None,
+                   scoring_weights: Dict = None, sector_patterns: Dict = None,
+                   attack_mapping_path: str = DEFAULT_MAPPING_PATH) -> List[Dict]:
+    """Process-pool worker: return the analysis of each threat in a chunk"""
+    analyzer = ThreatAnalyzer(attack_mapping_path=attack_mapping_path)
+    if scoring_weights is not None:
+        analyzer.scoring_weights = scoring_weights
+    if sector_patterns is not None:
+        analyzer.sector_patterns = sector_patterns
+        analyzer._register_keywords()
+    
+    return [t['analysis'] for t in analyzer.iter_analyze(threats, sector)]
+
+
+def _analyze_sectors_chunk(threats: List[Dict], sectors: List[str],
+                           scoring_weights: Dict = None, sector_patterns: Dict = None,
+                           attack_mapping_path: str = DEFAULT_MAPPING_PATH) -> List[Dict]:
+    """Process-pool worker: return the multi-sector analysis of each threat in a chunk"""
+    analyzer = ThreatAnalyzer(attack_mapping_path=attack_mapping_path)
+    if scoring_weights is not None:
+        analyzer.scoring_weights = scoring_weights
+    if sector_patterns is not None:
+        analyzer.sector_patterns = sector_patterns
+        analyzer._register_keywords()
+    
+    return [t['analysis'] for t in analyzer._iter_analyze_sectors(threats, sectors)]
 
 
 def main():
     """Main execution function"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Analyze collected threats')
+    parser.add_argument('--input', default='data/threats.json',
+                        help='Collected threats file (JSON array or NDJSON, optionally gzip/zstd)')
+    parser.add_argument('--db', help='Read threats from and store analysis in this SQLite database')
+    parser.add_argument('--output', default='data/analyzed_threats.json',
+                        help='Analyzed threats file (.json, .ndjson, optionally .gz/.zst)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reuse the previous analysis of unchanged threats')
+    parser.add_argument('--metrics-report', help='Time each stage and write a JSON run report here')
+    args = parser.parse_args()
+    
+    if args.metrics_report:
+        metrics.enabled = True
+        metrics.start_run()
+    
     # Load collected threats
-    try:
-        with open('data/threats.json', 'r') as f:
-            threats = json.load(f)
-    except FileNotFoundError:
-        logger.error("No threats found. Run threat_collector.py first.")
-        return
+    storage = None
+    if args.db:
+        storage = ThreatStorage(args.db)
+        threats = storage.iter_threats(order_by='created')
+    else:
+        try:
+            threats = iter_threat_file(args.input)
+        except FileNotFoundError:
+            logger.error("No threats found. Run threat_collector.py first.")
+            return
     
     # Analyze threats
     analyzer = ThreatAnalyzer()
     
+    if args.incremental:
+        # Stored threats carry their last analysis; otherwise use the previous output file
+        if storage is not None:
+            threats = list(threats)
+            analyzer.seed_analysis_cache(threats, sector='financial_services')
+        else:
+            try:
+                analyzer.seed_analysis_cache(iter_threat_file(args.output), sector='financial_services')
+            except FileNotFoundError:
+                logger.info("No previous analysis found; analyzing all threats")
+    
     # Analyze for financial services
-    fs_threats = analyzer.analyze(threats, sector='financial_services')
+    fs_threats = analyzer.analyze(threats, sector='financial_services', incremental=args.incremental)
     
     # Generate summary
     summary = analyzer.generate_summary_report()
+    if not summary:
+        logger.warning("No threats to analyze; keeping the previous analysis")
+        return
     
     # Save analysis
-    analyzer.save_analysis()
+    analyzer.save_analysis(args.output)
+    if storage is not None:
+        analyzer.store_analysis(storage)
+    if args.metrics_report:
+        metrics.write_report(args.metrics_report)
     
     # Display report
     print(f"\n{'='*60}")
@@ -387,11 +906,11 @@ def main():
     print(f"{'='*60}\n")
     
     # Display top 3 critical threats
-    critical = analyzer.get_threats_by_priority('critical')
+    critical = analyzer.get_top_threats(3, priority='critical')
     if critical:
         print(f"\nTop Critical Threats:")
         print(f"{'-'*60}")
-        for i, threat in enumerate(critical[:3], 1):
+        for i, threat in enumerate(critical, 1):
             print(f"\n{i}. {threat['name']}")
             print(f"   Risk Score: {threat['analysis']['risk_score']}")
             print(f"   Recommendations:")
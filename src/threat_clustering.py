@@ -0,0 +1,235 @@
+"""
+Near-Duplicate Threat Clustering
+Groups reports of the same campaign from different feeds using MinHash/LSH
+"""
+
+import hashlib
+import logging
+import random
+import re
+from collections import defaultdict
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Set, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+
+class MinHashLSH:
+    """MinHash signatures with LSH banding for candidate lookup
+    
+    Two sets are candidates when any of their ``bands`` signature bands
+    match exactly, so candidates are found without pairwise comparison.
+    """
+    
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        """Initialize hash permutations and band buckets"""
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        # Per band: band key -> {group: keys added while in that group}
+        self._buckets = [defaultdict(dict) for _ in range(bands)]
+    
+    def signature(self, tokens: Iterable[str]) -> Tuple[int, ...]:
+        """Compute the MinHash signature of a token set"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), 'big')
+            for token in set(tokens)
+        ]
+        if not hashes:
+            return (_MERSENNE_PRIME,) * self.num_perm
+        
+        prime = _MERSENNE_PRIME
+        return tuple(
+            min([(a * h + b) % prime for h in hashes])
+            for a, b in self._permutations
+        )
+    
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterable[Tuple[int, ...]]:
+        """Slice a signature into its band keys"""
+        rows = self.rows
+        return (signature[start:start + rows] for start in range(0, self.num_perm, rows))
+    
+    def candidate_groups(self, signature: Tuple[int, ...]) -> Iterator[List[Any]]:
+        """Yield the keys sharing a band with a signature, one list per band and group
+        
+        Every key of a list was in the same group when added; a key sharing
+        several bands is yielded once per band.
+        """
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket = buckets.get(band_key)
+            if bucket:
+                yield from bucket.values()
+    
+    def candidates(self, signature: Tuple[int, ...]) -> Set[Any]:
+        """Return the keys sharing a band with a signature"""
+        candidates = set()
+        for keys in self.candidate_groups(signature):
+            candidates.update(keys)
+        return candidates
+    
+    def add(self, key: Any, signature: Tuple[int, ...], group: Callable[[Any], Any] = None):
+        """Add a signature to its band buckets
+        
+        With ``group`` (such as a union-find lookup), keys are listed by
+        their group within each bucket, so callers can skip or stop early
+        on whole groups; every key is kept.
+        """
+        label = key if group is None else group(key)
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets[band_key].setdefault(label, []).append(key)
+    
+    def insert(self, key: Any, signature: Tuple[int, ...]) -> Set[Any]:
+        """Add a signature and return the keys already sharing a band with it"""
+        candidates = self.candidates(signature)
+        self.add(key, signature)
+        return candidates
+    
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """Estimate Jaccard similarity from two signatures"""
+        return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class ThreatClusterer:
+    """Merges near-duplicate STIX threats into canonical objects"""
+    
+    def __init__(self, threshold: float = 0.5, num_perm: int = 64,
+                 bands: int = 16, shingle_size: int = 3):
+        """Initialize clusterer"""
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+    
+    def cluster(self, threats: List[Dict]) -> List[Dict]:
+        """Return threats with each near-duplicate group merged into one
+        
+        Order follows the first member of each group.
+        """
+        lsh = MinHashLSH(self.num_perm, self.bands)
+        signatures = []
+        parent = list(range(len(threats)))
+        
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        # A threat joins a group when it is similar to any member sharing a
+        # band with it. Groups it already joined are skipped and scoring a
+        # group stops at its first similar member, so near-duplicates cost O(n)
+        for i, threat in enumerate(threats):
+            signature = lsh.signature(self._tokens(threat))
+            signatures.append(signature)
+            compared = set()
+            
+            for members in lsh.candidate_groups(signature):
+                root = find(members[0])
+                if root == find(i):
+                    continue
+                for j in members:
+                    if j in compared:
+                        continue
+                    compared.add(j)
+                    if MinHashLSH.similarity(signature, signatures[j]) >= self.threshold:
+                        parent[find(i)] = root
+                        break
+            lsh.add(i, signature, group=find)
+        
+        # Groups are created in order of their first member
+        groups = defaultdict(list)
+        for i in range(len(threats)):
+            groups[find(i)].append(threats[i])
+        
+        clustered = [
+            members[0] if len(members) == 1 else self._merge(members)
+            for members in groups.values()
+        ]
+        
+        logger.info(f"Merged {len(threats) - len(clustered)} near-duplicate threats")
+        return clustered
+    
+    def _tokens(self, threat: Dict) -> Set[str]:
+        """Build the token set used for similarity: IOCs, TTPs and text shingles"""
+        props = threat.get('custom_properties', {})
+        tokens = set()
+        
+        for values in props.get('iocs', {}).values():
+            for value in _as_list(values):
+                tokens.add(f"ioc:{str(value).lower()}")
+        tokens.update(f"ioc:{str(cve).lower()}" for cve in props.get('cve', []))
+        tokens.update(f"ttp:{ttp}" for ttp in props.get('ttps', []))
+        
+        words = re.findall(r'\w+', f"{threat.get('name', '')} {threat.get('description', '')}".lower())
+        k = self.shingle_size
+        tokens.update(
+            'txt:' + ' '.join(words[i:i + k])
+            for i in range(max(len(words) - k + 1, 1))
+        )
+        
+        return tokens
+    
+    def _merge(self, members: List[Dict]) -> Dict:
+        """Merge a group into the member with the highest confidence"""
+        canonical = max(members, key=lambda t: t.get('confidence', 0))
+        props = canonical.get('custom_properties', {})
+        
+        merged_props = {
+            **props,
+            'severity': max(
+                (m.get('custom_properties', {}).get('severity', 'medium') for m in members),
+                key=lambda s: _SEVERITY_RANK.get(s, 1)
+            ),
+            'sectors': _union(m.get('custom_properties', {}).get('sectors', []) for m in members),
+            'ttps': _union(m.get('custom_properties', {}).get('ttps', []) for m in members),
+            'cve': _union(m.get('custom_properties', {}).get('cve', []) for m in members),
+            'iocs': {},
+            'merged_ids': [m['id'] for m in members if m is not canonical]
+        }
+        
+        ioc_types = _union(m.get('custom_properties', {}).get('iocs', {}).keys() for m in members)
+        for ioc_type in ioc_types:
+            merged_props['iocs'][ioc_type] = _union(
+                _as_list(m.get('custom_properties', {}).get('iocs', {}).get(ioc_type, []))
+                for m in members
+            )
+        
+        references = []
+        seen = set()
+        for member in members:
+            for reference in member.get('external_references', []):
+                key = (reference.get('source_name'), reference.get('description'))
+                if key not in seen:
+                    seen.add(key)
+                    references.append(reference)
+        
+        return {
+            **canonical,
+            'modified': max(m.get('modified', '') for m in members),
+            'labels': _union(m.get('labels', []) for m in members),
+            'external_references': references,
+            'custom_properties': merged_props
+        }
+
+
+def _as_list(values: Any) -> List:
+    """Wrap a single IOC value in a list"""
+    return values if isinstance(values, list) else [values]
+
+
+def _union(lists: Iterable[Iterable]) -> List:
+    """Concatenate lists dropping repeats, keeping first-seen order"""
+    return list(dict.fromkeys(item for items in lists for item in items))
@@ -4,16 +4,91 @@ Aggregates threat data from multiple sources and normalizes to STIX 2.1 format
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import asyncio
+import itertools
 import json
+import re
+import threading
 import yaml
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import time
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from functools import partial
+from urllib.parse import urlsplit
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import logging
 from pathlib import Path
 
+try:
+    from .threat_io import iter_threat_file, write_threats
+    from .dedup_index import DedupIndex
+    from .threat_clustering import ThreatClusterer
+    from .threat_storage import ThreatStorage
+    from .threat_record import ThreatRecord, ThreatProperties
+    from .metrics import metrics
+except ImportError:
+    from threat_io import iter_threat_file, write_threats
+    from dedup_index import DedupIndex
+    from threat_clustering import ThreatClusterer
+    from threat_storage import ThreatStorage
+    from threat_record import ThreatRecord, ThreatProperties
+    from metrics import metrics
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TAXII_MEDIA_TYPE = 'application/taxii+json;version=2.1'
+
+# STIX indicator pattern object paths -> collector IOC types
+STIX_IOC_TYPES = {
+    'ipv4-addr:value': 'ip_addresses',
+    'ipv6-addr:value': 'ip_addresses',
+    'domain-name:value': 'domains',
+    'url:value': 'urls',
+    'email-addr:value': 'email_addresses',
+    'file:hashes': 'file_hashes'
+}
+# One `[object-path = 'value']` comparison of a STIX pattern
+_STIX_COMPARISON = re.compile(r"([a-z0-9-]+:[\w.'-]+)\s*=\s*'((?:[^'\\]|\\.)*)'")
+_SEVERITIES = ('critical', 'high', 'medium', 'low')
+
+
+class _DaemonThreadExecutor:
+    """Minimal executor running each call on its own daemon thread
+    
+    ``ThreadPoolExecutor`` workers are joined at interpreter exit, so a feed
+    that never returns would keep the process alive long after collection
+    gave up on it. At most ``max_workers`` calls run at once.
+    """
+    
+    def __init__(self, max_workers: int, thread_name_prefix: str = 'feed'):
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._thread_name_prefix = thread_name_prefix
+        self._counter = itertools.count()
+    
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule ``fn(*args, **kwargs)``; a future cancelled before it starts never runs"""
+        future = Future()
+        
+        def run():
+            with self._slots:
+                if not future.set_running_or_notify_cancel():
+                    return
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        
+        name = f"{self._thread_name_prefix}-{next(self._counter)}"
+        threading.Thread(target=run, name=name, daemon=True).start()
+        return future
+    
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        """Nothing to release; stalled calls end with the process"""
+
 
 class ThreatCollector:
     """Collects and normalizes threat intelligence from multiple sources"""
@@ -22,6 +97,13 @@ class ThreatCollector:
         """Initialize threat collector with configuration"""
         self.config = self._load_config(config_path)
         self.threats = []
+        self.state_path = self.config.get('collection', {}).get(
+            'state_path', 'data/collection_state.json'
+        )
+        self.feed_state = self._load_state()
+        self.dedup_index = self._open_dedup_index()
+        self._pending_fingerprints = []
+        self.storage = ThreatStorage.from_config(self.config)
         
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from YAML file"""
@@ -42,42 +124,231 @@ class ThreatCollector:
             },
             'collection': {
                 'interval_hours': 1,
-                'lookback_days': 7
+                'jitter_minutes': 5,
+                'lookback_days': 7,
+                'concurrent': True,
+                'max_workers': 4,
+                'feed_timeout_seconds': 60,
+                'state_path': 'data/collection_state.json',
+                'clustering': {
+                    'enabled': True,
+                    'threshold': 0.5
+                }
+            },
+            'metrics': {
+                'enabled': False,
+                'report_path': 'data/run_report.json'
             }
         }
     
-    def collect_all(self) -> List[Dict[str, Any]]:
-        """Collect threats from all enabled sources"""
+    def _open_dedup_index(self) -> Optional[DedupIndex]:
+        """Open the cross-run dedup index if one is configured"""
+        storage_config = self.config.get('storage', {})
+        if not storage_config.get('dedup_index'):
+            return None
+        
+        return DedupIndex(
+            storage_config['dedup_index'],
+            ttl_days=storage_config.get('retention_days', 365)
+        )
+    
+    def _load_state(self) -> Dict[str, Dict[str, str]]:
+        """Load per-feed collection cursors from the state file"""
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logger.warning(f"Corrupt collection state in {self.state_path}; starting fresh")
+            return {}
+    
+    def _save_state(self):
+        """Persist per-feed collection cursors"""
+        Path(self.state_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.feed_state, f, indent=2)
+        Path(tmp_path).replace(self.state_path)
+    
+    def _feed_since(self, key: str, full_resync: bool = False) -> Optional[datetime]:
+        """Return the time a feed should be collected from
+        
+        That is the start of the feed's last successful collection or, for a
+        feed never collected before, ``lookback_days`` ago. A full resync
+        ignores both and pulls everything. Times are in UTC.
+        """
+        if full_resync:
+            return None
+        
+        last_success = self.feed_state.get(key, {}).get('last_success')
+        if last_success:
+            # Cursors saved before they were kept in UTC are local times
+            return _to_utc(datetime.fromisoformat(last_success))
+        
+        lookback_days = self.config.get('collection', {}).get('lookback_days')
+        if lookback_days:
+            return datetime.now(timezone.utc) - timedelta(days=lookback_days)
+        return None
+    
+    def _advance_cursors(self, keys: List[str], run_started: datetime):
+        """Record a successful collection for each feed key"""
+        for key in keys:
+            self.feed_state[key] = {'last_success': run_started.isoformat()}
+        self._save_state()
+    
+    @metrics.timed('collector.collect_all')
+    def collect_all(self, concurrent: bool = None, full_resync: bool = False) -> List[Dict[str, Any]]:
+        """Collect threats from all enabled sources
+        
+        Each feed is only asked for records since its last successful
+        collection unless ``full_resync`` is set.
+        """
         logger.info("Starting threat collection from all sources...")
         
-        all_threats = []
+        return self._process(self.iter_collect(concurrent, full_resync), full_resync)
+    
+    def iter_threats(self, concurrent: bool = None, full_resync: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield unique STIX threats from all enabled sources one at a time
         
-        # Collect from each enabled source
-        if self.config['threat_feeds'].get('cisa_ais', {}).get('enabled'):
-            all_threats.extend(self.collect_cisa_ais())
+        Clustering needs every threat of the run at once, so near-duplicate
+        reports are not merged here; use ``collect_all`` for that.
+        """
+        if self.config.get('collection', {}).get('clustering', {}).get('enabled'):
+            logger.warning("Clustering is not applied when streaming threats; use collect_all to merge near-duplicates")
+        return self.iter_dedup(self.iter_normalize(self.iter_collect(concurrent, full_resync)), full_resync)
+    
+    def iter_collect(self, concurrent: bool = None, full_resync: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield raw feed records, one feed at a time
+        
+        Feed cursors advance once the generator is exhausted.
+        """
+        collection_config = self.config.get('collection', {})
+        if concurrent is None:
+            concurrent = collection_config.get('concurrent', False)
+        
+        run_started = datetime.now(timezone.utc)
+        feeds = [
+            (name, partial(collect, since=self._feed_since(name, full_resync)))
+            for name, collect in self._enabled_feeds()
+        ]
         
-        if self.config['threat_feeds'].get('fs_isac', {}).get('enabled'):
-            all_threats.extend(self.collect_fs_isac())
+        succeeded = []
         
-        if self.config['threat_feeds'].get('osint', {}).get('enabled'):
-            all_threats.extend(self.collect_osint())
+        # Collect from each enabled source
+        if concurrent and len(feeds) > 1:
+            results = self._collect_concurrent(
+                feeds,
+                max_workers=collection_config.get('max_workers', 4),
+                timeout=collection_config.get('feed_timeout_seconds', 60)
+            )
+            for name, _ in feeds:
+                if name in results:
+                    yield from results.pop(name)
+                    succeeded.append(name)
+        else:
+            for name, collect in feeds:
+                yield from collect()
+                succeeded.append(name)
+        
+        self._advance_cursors(succeeded, run_started)
+    
+    def _process(self, all_threats: Iterable[Dict], full_resync: bool = False) -> List[Dict[str, Any]]:
+        """Normalize, deduplicate and cluster raw feed records"""
+        # The stages run interleaved, one record at a time
+        records = metrics.iter_timed('collector.fetch', all_threats)
+        normalized = metrics.iter_timed('collector.normalize', self.iter_normalize(records))
+        deduplicated_threats = list(metrics.iter_timed('collector.deduplicate', self.iter_dedup(normalized, full_resync)))
         
-        # Normalize and deduplicate
-        normalized_threats = self._normalize_threats(all_threats)
-        deduplicated_threats = self._deduplicate(normalized_threats)
+        clustering_config = self.config.get('collection', {}).get('clustering', {})
+        if clustering_config.get('enabled'):
+            clusterer = ThreatClusterer(
+                threshold=clustering_config.get('threshold', 0.5),
+                num_perm=clustering_config.get('num_perm', 64),
+                bands=clustering_config.get('bands', 16)
+            )
+            with metrics.timer('collector.cluster') as timer:
+                deduplicated_threats = clusterer.cluster(deduplicated_threats)
+                timer.items = len(deduplicated_threats)
         
         logger.info(f"Collected {len(deduplicated_threats)} unique threats")
         self.threats = deduplicated_threats
         
         return deduplicated_threats
     
-    def collect_cisa_ais(self) -> List[Dict[str, Any]]:
+    def _enabled_feeds(self) -> List[Tuple[str, Callable[..., List[Dict[str, Any]]]]]:
+        """List (name, collector) pairs for every enabled feed"""
+        feed_config = self.config.get('threat_feeds', {})
+        collectors = [
+            ('cisa_ais', self.collect_cisa_ais),
+            ('fs_isac', self.collect_fs_isac),
+            ('osint', self.collect_osint)
+        ]
+        
+        return [
+            (name, collect) for name, collect in collectors
+            if feed_config.get(name, {}).get('enabled')
+        ]
+    
+    def _collect_concurrent(self, feeds: List[Tuple[str, Callable]],
+                            max_workers: int = 4,
+                            timeout: float = 60) -> Dict[str, List[Dict[str, Any]]]:
+        """Run feed collectors on a thread pool with a per-feed timeout
+        
+        A feed that raises or runs past ``timeout`` seconds is logged and
+        left out of the returned ``{feed name: records}`` mapping.
+        """
+        started = {}
+        
+        def run(name, collect):
+            started[name] = time.monotonic()
+            return collect()
+        
+        workers = max(1, min(max_workers, len(feeds)))
+        executor = _DaemonThreadExecutor(max_workers=workers, thread_name_prefix='feed')
+        futures = {executor.submit(run, name, collect): name for name, collect in feeds}
+        results = {}
+        pending = set(futures)
+        
+        # Stalled workers keep their thread, so queued feeds also need a bound
+        rounds = -(-len(feeds) // workers)
+        deadline = time.monotonic() + timeout * rounds
+        
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Feed {name} failed: {e}")
+                        metrics.count('collector.feed_failures')
+                
+                # Abandon feeds that have been running longer than the timeout
+                now = time.monotonic()
+                for future in list(pending):
+                    name = futures[future]
+                    if now > deadline or (name in started and now - started[name] > timeout):
+                        logger.warning(f"Feed {name} timed out after {timeout}s; skipping")
+                        metrics.count('collector.feed_failures')
+                        future.cancel()
+                        pending.discard(future)
+        finally:
+            # Stalled feeds are left on daemon threads, which do not delay process exit
+            executor.shutdown(wait=False)
+        
+        return results
+    
+    def collect_cisa_ais(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """Collect threats from CISA AIS (Automated Indicator Sharing)"""
         logger.info("Collecting from CISA AIS...")
         
         # In production, this would connect to CISA AIS API
         # For demonstration, return sample data
-        return [
+        return self._filter_since([
             {
                 'source': 'CISA_AIS',
                 'threat_type': 'malware',
@@ -94,14 +365,14 @@ class ThreatCollector:
                 'ttps': ['T1486', 'T1566.001'],  # MITRE ATT&CK techniques
                 'cve': []
             }
-        ]
+        ], since)
     
-    def collect_fs_isac(self) -> List[Dict[str, Any]]:
+    def collect_fs_isac(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """Collect threats from FS-ISAC (Financial Services ISAC)"""
         logger.info("Collecting from FS-ISAC...")
         
         # In production, this would connect to FS-ISAC API
-        return [
+        return self._filter_since([
             {
                 'source': 'FS_ISAC',
                 'threat_type': 'fraud',
@@ -117,14 +388,14 @@ class ThreatCollector:
                 'ttps': ['T1566.002'],
                 'cve': []
             }
-        ]
+        ], since)
     
-    def collect_osint(self) -> List[Dict[str, Any]]:
+    def collect_osint(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """Collect threats from open-source intelligence"""
         logger.info("Collecting from OSINT sources...")
         
         # Sample OSINT data
-        return [
+        return self._filter_since([
             {
                 'source': 'OSINT',
                 'threat_type': 'vulnerability',
@@ -139,41 +410,58 @@ class ThreatCollector:
                 'ttps': ['T1190'],
                 'affected_products': ['FarmSensor Pro v2.1', 'AgriMonitor 3000']
             }
-        ]
+        ], since)
+    
+    def _filter_since(self, threats: List[Dict], since: Optional[datetime]) -> List[Dict]:
+        """Drop records last published before ``since``"""
+        if since is None:
+            return threats
+        
+        recent = []
+        for threat in threats:
+            try:
+                published = datetime.fromisoformat(threat.get('timestamp', '').replace('Z', '+00:00'))
+            except ValueError:
+                recent.append(threat)
+                continue
+            if _to_utc(published) >= since:
+                recent.append(threat)
+        
+        return recent
     
+    @metrics.timed('collector.normalize')
     def _normalize_threats(self, threats: List[Dict]) -> List[Dict]:
         """Normalize threats to standard STIX 2.1 format"""
-        normalized = []
+        return list(self.iter_normalize(threats))
+    
+    def iter_normalize(self, threats: Iterable[Dict]) -> Iterator[ThreatRecord]:
+        """Yield each raw record normalized to STIX 2.1 format
         
+        Records are compact ``ThreatRecord`` mappings with the STIX dict's
+        keys; they become plain dicts only when written out. ``modified``
+        comes from the feed (its ``modified``, else ``timestamp``), so a
+        record collected again unchanged keeps it and reuses its analysis.
+        """
         for threat in threats:
-            normalized_threat = {
-                'id': self._generate_threat_id(threat),
-                'type': 'indicator',
-                'spec_version': '2.1',
-                'created': threat.get('timestamp', datetime.now().isoformat()),
-                'modified': datetime.now().isoformat(),
-                'name': threat.get('name', 'Unknown Threat'),
-                'description': threat.get('description', ''),
-                'pattern_type': 'stix',
-                'valid_from': threat.get('timestamp', datetime.now().isoformat()),
-                'labels': self._generate_labels(threat),
-                'confidence': self._calculate_confidence(threat),
-                'external_references': [{
-                    'source_name': threat.get('source', 'unknown'),
-                    'description': threat.get('description', '')
-                }],
-                'object_marking_refs': ['marking-definition--tlp-amber'],
-                'custom_properties': {
-                    'severity': threat.get('severity', 'medium'),
-                    'sectors': threat.get('sectors', []),
-                    'iocs': threat.get('iocs', {}),
-                    'ttps': threat.get('ttps', []),
-                    'cve': threat.get('cve', [])
-                }
-            }
-            normalized.append(normalized_threat)
-        
-        return normalized
+            yield ThreatRecord(
+                id=self._generate_threat_id(threat),
+                created=threat.get('timestamp', datetime.now().isoformat()),
+                modified=threat.get('modified') or threat.get('timestamp') or datetime.now().isoformat(),
+                name=threat.get('name', 'Unknown Threat'),
+                description=threat.get('description', ''),
+                valid_from=threat.get('timestamp', datetime.now().isoformat()),
+                labels=self._generate_labels(threat),
+                confidence=self._calculate_confidence(threat),
+                source=threat.get('source', 'unknown'),
+                custom_properties=ThreatProperties(
+                    severity=threat.get('severity', 'medium'),
+                    sectors=threat.get('sectors', []),
+                    iocs=threat.get('iocs', {}),
+                    ttps=threat.get('ttps', []),
+                    cve=threat.get('cve', []),
+                    fingerprint=self._generate_fingerprint(threat)
+                )
+            )
     
     def _generate_threat_id(self, threat: Dict) -> str:
         """Generate unique threat ID"""
@@ -182,6 +470,27 @@ class ThreatCollector:
         hash_obj = hashlib.md5(threat_str.encode())
         return f"indicator--{hash_obj.hexdigest()}"
     
+    def _generate_fingerprint(self, threat: Dict) -> str:
+        """Generate a content fingerprint that is stable across re-publication
+        
+        Built from the source, IOC set and TTP set; the name is only used
+        when a record carries neither IOCs nor TTPs.
+        """
+        import hashlib
+        iocs = sorted(
+            f"{ioc_type}:{value}"
+            for ioc_type, values in threat.get('iocs', {}).items()
+            for value in (values if isinstance(values, list) else [values])
+        )
+        iocs.extend(sorted(f"cve:{cve}" for cve in threat.get('cve', [])))
+        ttps = sorted(set(threat.get('ttps', [])))
+        
+        parts = [threat.get('source', 'unknown'), '|'.join(iocs), '|'.join(ttps)]
+        if not iocs and not ttps:
+            parts.append(threat.get('name', ''))
+        
+        return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+    
     def _generate_labels(self, threat: Dict) -> List[str]:
         """Generate STIX labels for threat"""
         labels = []
@@ -208,28 +517,122 @@ class ThreatCollector:
         source = threat.get('source', 'OSINT')
         return source_confidence.get(source, 60)
     
+    @metrics.timed('collector.deduplicate')
     def _deduplicate(self, threats: List[Dict]) -> List[Dict]:
         """Remove duplicate threats"""
+        return list(self.iter_dedup(threats))
+    
+    def iter_dedup(self, threats: Iterable[Dict], full_resync: bool = False) -> Iterator[Dict]:
+        """Yield threats whose ID has not been seen earlier in the stream
+        
+        With a configured ``storage.dedup_index``, threats whose fingerprint
+        was seen in an earlier run (within ``retention_days``) are dropped too,
+        unless ``full_resync`` is set. Fingerprints of the yielded threats are
+        only recorded by ``commit_fingerprints``, once the threats are saved,
+        so threats from a run that failed to save are collected again.
+        """
         seen_ids = set()
-        unique_threats = []
+        self._pending_fingerprints = []
+        pending = set()
+        duplicates = 0
+        known = 0
         
         for threat in threats:
             threat_id = threat['id']
-            if threat_id not in seen_ids:
-                seen_ids.add(threat_id)
-                unique_threats.append(threat)
+            if threat_id in seen_ids:
+                duplicates += 1
+                continue
+            seen_ids.add(threat_id)
+            
+            fingerprint = threat.get('custom_properties', {}).get('fingerprint')
+            if self.dedup_index is not None and fingerprint:
+                if not full_resync and (fingerprint in pending or fingerprint in self.dedup_index):
+                    known += 1
+                    continue
+                if fingerprint not in pending:
+                    pending.add(fingerprint)
+                    self._pending_fingerprints.append(fingerprint)
+            
+            yield threat
+        
+        metrics.count('collector.duplicates', duplicates)
+        metrics.count('collector.known_fingerprints', known)
+        if self.dedup_index is not None:
+            logger.info(f"Skipped {known} threats already collected in earlier runs")
+        logger.info(f"Removed {duplicates} duplicates")
+    
+    def commit_fingerprints(self) -> int:
+        """Record the fingerprints of the last collection in the dedup index
+        
+        Called by ``save_threats`` and ``store_threats`` once they succeed;
+        call it yourself after saving threats some other way.
+        """
+        if self.dedup_index is None or not self._pending_fingerprints:
+            return 0
+        
+        added = self.dedup_index.add_many(self._pending_fingerprints)
+        self._pending_fingerprints = []
+        return added
+    
+    def save_threats(self, output_path: str = 'data/threats.json',
+                     threats: Iterable[Dict] = None, merge: bool = False) -> int:
+        """Save collected threats to file
+        
+        ``threats`` may be any iterable, such as ``iter_threats()``, and is
+        written as it is consumed. Defaults to the last ``collect_all`` result.
+        The format follows the file name: ``.ndjson`` for one threat per
+        line, ``.gz``/``.zst`` to compress (see ``write_threats``).
+        
+        With ``merge``, the threats are added to those already in the file
+        (replacing ones with the same id) instead of overwriting it, since
+        feed cursors and the dedup index make each run collect only new
+        records. Merged threats older than ``retention_days`` are dropped.
+        Once written, the collected fingerprints are recorded in the dedup index.
+        """
+        if threats is None:
+            threats = self.threats
+        if merge:
+            threats = self._merge_with_existing(output_path, list(threats))
+        
+        count = write_threats(output_path, threats)
+        self.commit_fingerprints()
+        
+        logger.info(f"Saved {count} threats to {output_path}")
+        return count
+    
+    def _merge_with_existing(self, output_path: str, threats: List[Dict]) -> Iterator[Dict]:
+        """Yield the retained threats of an existing file not in ``threats``, then ``threats``"""
+        try:
+            existing = iter_threat_file(output_path)
+        except FileNotFoundError:
+            existing = iter(())
+        
+        retention_days = self.config.get('storage', {}).get('retention_days', 365)
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        new_ids = {threat['id'] for threat in threats}
         
-        logger.info(f"Removed {len(threats) - len(unique_threats)} duplicates")
-        return unique_threats
+        # The file is only replaced once fully written, so it can be read meanwhile
+        for threat in existing:
+            if threat.get('id') not in new_ids and (threat.get('created') or cutoff) >= cutoff:
+                yield threat
+        yield from threats
     
-    def save_threats(self, output_path: str = 'data/threats.json'):
-        """Save collected threats to file"""
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    def store_threats(self, threats: Iterable[Dict] = None) -> int:
+        """Upsert threats into the configured storage database
         
-        with open(output_path, 'w') as f:
-            json.dump(self.threats, f, indent=2)
+        Defaults to the last ``collect_all`` result. Once stored, the collected
+        fingerprints are recorded in the dedup index and threats past the
+        retention period are pruned.
+        """
+        if self.storage is None:
+            raise RuntimeError("No storage configured (set storage.database: sqlite)")
+        if threats is None:
+            threats = self.threats
         
-        logger.info(f"Saved {len(self.threats)} threats to {output_path}")
+        count = self.storage.upsert_many(threats)
+        self.commit_fingerprints()
+        self.storage.prune()
+        return count
     
     def get_threats_by_sector(self, sector: str) -> List[Dict]:
         """Filter threats by sector"""
@@ -246,15 +649,294 @@ class ThreatCollector:
         ]
 
 
+class AsyncThreatCollector(ThreatCollector):
+    """Collects threats from every feed in a single asyncio event loop
+    
+    Feeds with an ``endpoint`` (and OSINT ``sources`` given as URLs) are
+    fetched over HTTP through one pooled keep-alive ``requests.Session`` per
+    host. Responses are paged using the TAXII 2.1 envelope (``objects``,
+    ``more``, ``next``); STIX indicators in it are mapped to collector
+    records. Feeds without an endpoint fall back to the built-in collectors.
+    """
+    
+    source_names = {
+        'cisa_ais': 'CISA_AIS',
+        'fs_isac': 'FS_ISAC',
+        'osint': 'OSINT'
+    }
+    
+    def __init__(self, config_path: str = 'config/config.yaml',
+                 max_connections: int = 20, page_size: int = 100,
+                 request_timeout: float = 30):
+        """Initialize async collector with configuration"""
+        super().__init__(config_path)
+        self.max_connections = max_connections
+        self.page_size = page_size
+        self.request_timeout = request_timeout
+        self._sessions: Dict[str, requests.Session] = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @metrics.timed('collector.collect_all')
+    def collect_all(self, concurrent: bool = None, full_resync: bool = False) -> List[Dict[str, Any]]:
+        """Collect threats from all enabled sources in an event loop"""
+        return asyncio.run(self.collect_all_async(full_resync=full_resync))
+    
+    async def collect_all_async(self, full_resync: bool = False) -> List[Dict[str, Any]]:
+        """Collect threats from all enabled sources without blocking the loop"""
+        logger.info("Starting async threat collection from all sources...")
+        
+        run_started = datetime.now(timezone.utc)
+        collection_config = self.config.get('collection', {})
+        limit = collection_config.get('max_threats_per_source', 1000)
+        timeout = collection_config.get('feed_timeout_seconds', 60)
+        
+        executor = _DaemonThreadExecutor(max_workers=self.max_connections, thread_name_prefix='feed-http')
+        try:
+            feeds = self._feed_endpoints()
+            tasks = [
+                asyncio.wait_for(self._fetch_feed(
+                    executor, name, endpoint, headers, limit=limit,
+                    since=self._feed_since(endpoint or name, full_resync)
+                ), timeout)
+                for name, endpoint, headers in feeds
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            executor.shutdown(wait=False)
+        
+        all_threats = []
+        succeeded = []
+        for (name, endpoint, _), result in zip(feeds, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning(f"Feed {endpoint or name} timed out after {timeout}s; skipping")
+                metrics.count('collector.feed_failures')
+            elif isinstance(result, Exception):
+                logger.error(f"Feed {endpoint or name} failed: {result}")
+                metrics.count('collector.feed_failures')
+            else:
+                all_threats.extend(result)
+                succeeded.append(endpoint or name)
+        
+        self._advance_cursors(succeeded, run_started)
+        
+        return self._process(all_threats, full_resync)
+    
+    def _feed_endpoints(self) -> List[Tuple[str, Optional[str], Dict[str, str]]]:
+        """List (feed name, endpoint, headers) for every enabled feed
+        
+        ``endpoint`` is None for feeds served by the built-in collectors.
+        """
+        feeds = []
+        
+        for name, _ in self._enabled_feeds():
+            feed_config = self.config['threat_feeds'][name]
+            headers = {'Accept': TAXII_MEDIA_TYPE}
+            if feed_config.get('api_key'):
+                headers['Authorization'] = f"Bearer {feed_config['api_key']}"
+            
+            endpoints = [
+                s for s in feed_config.get('sources', [])
+                if isinstance(s, str) and '://' in s
+            ]
+            if feed_config.get('endpoint'):
+                endpoints.insert(0, feed_config['endpoint'])
+            
+            if endpoints:
+                feeds.extend((name, endpoint, headers) for endpoint in endpoints)
+            else:
+                feeds.append((name, None, headers))
+        
+        return feeds
+    
+    def _get_session(self, endpoint: str) -> requests.Session:
+        """Return the pooled keep-alive session for an endpoint's host"""
+        parts = urlsplit(endpoint)
+        key = f"{parts.scheme}://{parts.netloc}"
+        
+        session = self._sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=self.max_connections
+            )
+            session.mount(key, adapter)
+            self._sessions[key] = session
+        
+        return session
+    
+    async def _fetch_feed(self, executor: _DaemonThreadExecutor, name: str,
+                          endpoint: Optional[str], headers: Dict[str, str],
+                          limit: int = 1000,
+                          since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Page through one feed until it is exhausted or ``limit`` is reached"""
+        loop = asyncio.get_running_loop()
+        
+        if endpoint is None:
+            collect = partial(getattr(self, f'collect_{name}'), since=since)
+            records = await loop.run_in_executor(executor, collect)
+            return records[:limit]
+        
+        source = self.source_names[name]
+        session = self._get_session(endpoint)
+        records = []
+        params = {}
+        if since is not None:
+            params['added_after'] = _rfc3339(since)
+        
+        while len(records) < limit:
+            params['limit'] = min(self.page_size, limit - len(records))
+            response = await loop.run_in_executor(executor, partial(
+                session.get, endpoint, params=dict(params),
+                headers=headers, timeout=self.request_timeout
+            ))
+            response.raise_for_status()
+            page = response.json()
+            metrics.count('collector.http_requests')
+            metrics.count('collector.bytes_read', len(response.content))
+            
+            if isinstance(page, list):
+                objects, cursor = page, None
+            else:
+                objects = page.get('objects', [])
+                cursor = page.get('next') if page.get('more', 'next' in page) else None
+            
+            records.extend(self._feed_records(objects, source))
+            
+            if not objects or not cursor:
+                break
+            params['next'] = cursor
+        
+        logger.info(f"Collected {len(records)} records from {endpoint}")
+        return records[:limit]
+    
+    def _feed_records(self, objects: List[Dict], source: str) -> Iterator[Dict[str, Any]]:
+        """Turn one page of feed objects into raw collector records
+        
+        STIX indicators are mapped to the collector's record fields; other
+        STIX objects (identities, relationships, markings, ...) are skipped.
+        Plain JSON records pass through unchanged.
+        """
+        skipped = 0
+        for obj in objects:
+            if not _is_stix_object(obj):
+                obj.setdefault('source', source)
+                yield obj
+            elif obj.get('type') == 'indicator':
+                yield _from_stix_indicator(obj, source)
+            else:
+                skipped += 1
+        
+        metrics.count('collector.stix_objects_skipped', skipped)
+    
+    def close(self):
+        """Close all pooled HTTP sessions"""
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+
+def _is_stix_object(obj: Dict) -> bool:
+    """Whether a feed object is a STIX object (``<type>--<uuid>`` id)"""
+    return isinstance(obj.get('type'), str) and str(obj.get('id', '')).startswith(f"{obj['type']}--")
+
+
+def _from_stix_indicator(indicator: Dict, source: str) -> Dict[str, Any]:
+    """Map a STIX 2.1 indicator to a raw collector record
+    
+    IOCs come from the pattern's equality comparisons, TTPs and CVEs from
+    the MITRE ATT&CK and CVE external references.
+    """
+    iocs: Dict[str, List[str]] = {}
+    for path, value in _STIX_COMPARISON.findall(indicator.get('pattern', '')):
+        ioc_type = STIX_IOC_TYPES.get(path.split('.', 1)[0])
+        if ioc_type:
+            value = value.replace("\\'", "'").replace('\\\\', '\\')
+            iocs.setdefault(ioc_type, []).append(value)
+    
+    ttps = []
+    cves = []
+    for reference in indicator.get('external_references', []):
+        external_id = reference.get('external_id', '')
+        if reference.get('source_name') == 'mitre-attack' and external_id.startswith('T'):
+            ttps.append(external_id)
+        elif reference.get('source_name') == 'cve' and external_id:
+            cves.append(external_id)
+    
+    labels = [str(label).lower() for label in indicator.get('labels', [])]
+    severity = indicator.get('x_severity') or next(
+        (label for label in labels if label in _SEVERITIES), 'medium'
+    )
+    indicator_types = indicator.get('indicator_types', [])
+    
+    record = {
+        'source': source,
+        'name': indicator.get('name') or indicator.get('pattern', 'Unknown Threat'),
+        'description': indicator.get('description', ''),
+        'severity': severity,
+        'sectors': indicator.get('x_sectors', []),
+        'iocs': iocs,
+        'ttps': ttps,
+        'cve': cves
+    }
+    if indicator_types:
+        record['threat_type'] = indicator_types[0]
+    
+    # valid_from is when the indicator applies; created is the fallback
+    timestamp = indicator.get('valid_from') or indicator.get('created')
+    if timestamp:
+        record['timestamp'] = timestamp
+    if indicator.get('modified'):
+        record['modified'] = indicator['modified']
+    
+    return record
+
+
+def _to_utc(moment: datetime) -> datetime:
+    """Convert to an aware UTC datetime, reading naive ones as local time"""
+    return moment.astimezone(timezone.utc)
+
+
+def _rfc3339(moment: datetime) -> str:
+    """Format as the RFC 3339 UTC timestamp TAXII filters expect"""
+    return _to_utc(moment).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
 def main():
     """Main execution function"""
-    collector = ThreatCollector()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Collect threat intelligence from all enabled feeds')
+    parser.add_argument('--config', default='config/config.yaml', help='Path to configuration file')
+    parser.add_argument('--full-resync', action='store_true',
+                        help='Ignore saved feed cursors and pull everything')
+    parser.add_argument('--output', default='data/threats.json',
+                        help='Collected threats file (.json, .ndjson, optionally .gz/.zst)')
+    parser.add_argument('--metrics-report', help='Time each stage and write a JSON run report here')
+    args = parser.parse_args()
+    
+    collector = ThreatCollector(args.config)
+    metrics.configure(collector.config)
+    if args.metrics_report:
+        metrics.enabled = True
+    metrics.start_run()
     
     # Collect all threats
-    threats = collector.collect_all()
+    threats = collector.collect_all(full_resync=args.full_resync)
+    
+    # Add to the previously collected threats
+    collector.save_threats(args.output, merge=True)
+    if collector.storage is not None:
+        collector.store_threats()
     
-    # Save to file
-    collector.save_threats()
+    report_path = args.metrics_report or collector.config.get('metrics', {}).get('report_path')
+    if metrics.enabled and report_path:
+        metrics.write_report(report_path)
     
     # Display summary
     print(f"\n{'='*60}")
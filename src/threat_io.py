@@ -0,0 +1,212 @@
+"""
+Threat Data I/O
+Streaming readers and writers for threat files
+"""
+
+import gzip
+import io
+import itertools
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, TextIO
+
+try:
+    import zstandard
+except ImportError:  # .zst threat files need the optional zstandard package
+    zstandard = None
+
+try:
+    from .threat_record import to_json
+    from .metrics import metrics
+except ImportError:
+    from threat_record import to_json
+    from metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd'}
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_SEPARATORS = re.compile(r'[\s,]*')
+_READ_CHUNK_SIZE = 1 << 16
+
+
+def _file_format(path: Path):
+    """Return (is NDJSON, compression) named by a file's suffixes"""
+    suffixes = [suffix.lower() for suffix in path.suffixes]
+    compression = COMPRESSION_SUFFIXES.get(suffixes[-1]) if suffixes else None
+    if compression:
+        suffixes.pop()
+    return bool(suffixes) and suffixes[-1] in NDJSON_SUFFIXES, compression
+
+
+def _require_zstandard():
+    """Fail clearly when zstd support is not installed"""
+    if zstandard is None:
+        raise ImportError("zstd-compressed threat files require the 'zstandard' package")
+
+
+def _open_text(path: Path, mode: str, compression: str = None) -> TextIO:
+    """Open a possibly compressed file in text mode"""
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+    if compression == 'zstd':
+        _require_zstandard()
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _write_array(f: TextIO, threats: Iterable[Dict]) -> int:
+    """Write threats as a pretty-printed JSON array"""
+    count = 0
+    for threat in threats:
+        f.write('[\n  ' if count == 0 else ',\n  ')
+        f.write(json.dumps(threat, indent=2, default=to_json).replace('\n', '\n  '))
+        count += 1
+    f.write('\n]' if count else '[]')
+    return count
+
+
+def _write_ndjson(f: TextIO, threats: Iterable[Dict]) -> int:
+    """Write threats as compact JSON, one per line"""
+    count = 0
+    for threat in threats:
+        f.write(json.dumps(threat, separators=(',', ':'), default=to_json))
+        f.write('\n')
+        count += 1
+    return count
+
+
+def write_threats(output_path: str, threats: Iterable[Dict]) -> int:
+    """Write threats to a file one at a time, in the format its name gives
+    
+    ``.ndjson`` and ``.jsonl`` files get one compact threat per line; any
+    other name gets the JSON array ``json.dump(threats, f, indent=2)`` would
+    write. A further ``.gz`` or ``.zst`` suffix compresses the output. The
+    file is written beside the target and renamed into place, so readers
+    never see a partial file. Returns the number written.
+    """
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ndjson, compression = _file_format(path)
+    
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        with _open_text(tmp_path, 'w', compression) as f:
+            count = _write_ndjson(f, threats) if ndjson else _write_array(f, threats)
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    
+    if metrics.enabled:
+        metrics.count('threat_io.bytes_written', path.stat().st_size)
+    return count
+
+
+def append_threats(output_path: str, threats: Iterable[Dict]) -> int:
+    """Append threats to an uncompressed NDJSON file; returns the number written
+    
+    Unlike ``write_threats`` this costs only the appended threats, but a
+    crash can leave a partial last line.
+    """
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(path, 'ab') as raw:
+        start = raw.tell()
+        with io.TextIOWrapper(raw, encoding='utf-8') as f:
+            count = _write_ndjson(f, threats)
+            f.flush()
+            metrics.count('threat_io.bytes_written', raw.tell() - start)
+    
+    return count
+
+
+def _open_for_read(path: Path) -> TextIO:
+    """Open a threat file, detecting compression from its first bytes"""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    
+    if magic.startswith(_GZIP_MAGIC):
+        return _open_text(path, 'r', 'gzip')
+    if magic.startswith(_ZSTD_MAGIC):
+        return _open_text(path, 'r', 'zstd')
+    return _open_text(path, 'r')
+
+
+def _iter_ndjson(f: TextIO, head: str) -> Iterator[Dict]:
+    """Yield one threat per non-blank line"""
+    # Complete the line the format check stopped in, then read line by line
+    for line in itertools.chain((head + f.readline()).splitlines(), f):
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_array(f: TextIO, buffer: str) -> Iterator[Dict]:
+    """Yield the elements of a JSON array, decoding one at a time"""
+    decoder = json.JSONDecoder()
+    pos = 0
+    eof = False
+    
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        
+        if pos < len(buffer):
+            try:
+                threat, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # An element ending at the buffer edge may continue in the file
+                if end < len(buffer) or eof:
+                    yield threat
+                    pos = end
+                    continue
+        elif eof:
+            raise ValueError(f"Unterminated JSON array in {f.name}")
+        
+        # Read at least as much as is buffered, so a large element is
+        # re-decoded only a logarithmic number of times
+        chunk = f.read(max(_READ_CHUNK_SIZE, len(buffer) - pos))
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def iter_threat_file(path: str) -> Iterator[Dict]:
+    """Lazily yield the threats of a JSON array or NDJSON file
+    
+    The format and any gzip or zstd compression are detected from the file
+    contents, so every file ``write_threats`` produces can be read. The
+    file is opened immediately; a missing file raises ``FileNotFoundError``
+    here rather than on first iteration.
+    """
+    f = _open_for_read(Path(path))
+    if metrics.enabled:
+        metrics.count('threat_io.bytes_read', Path(path).stat().st_size)
+    
+    def threats():
+        with f:
+            head = f.read(_READ_CHUNK_SIZE).lstrip()
+            if head.startswith('['):
+                yield from _iter_array(f, head[1:])
+            else:
+                yield from _iter_ndjson(f, head)
+    
+    return threats()
+
+
+def read_threats(path: str) -> List[Dict]:
+    """Read every threat of a file written by ``write_threats``"""
+    return list(iter_threat_file(path))
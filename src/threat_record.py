@@ -0,0 +1,233 @@
+"""
+Compact Threat Records
+Slotted, read-only STIX indicator records and copy-free enrichment overlays
+"""
+
+import copyreg
+import logging
+import sys
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Small vocabularies (sector and label sets) repeat across most threats
+_shared_tuples = {}
+
+
+def _interned(values: Iterable[str]) -> Tuple[str, ...]:
+    """Tuple of interned strings"""
+    return tuple(sys.intern(str(v)) for v in values)
+
+
+def _shared(values: Iterable[str]) -> Tuple[str, ...]:
+    """Interned tuple shared by every record with the same values"""
+    values = _interned(values)
+    return _shared_tuples.setdefault(values, values)
+
+
+def freeze(value: Any) -> Any:
+    """Read-only copy of JSON-shaped data: dicts become ``MappingProxyType``, lists tuples
+    
+    For analysis fragments shared by many threats, so an in-place edit by
+    one consumer cannot change every other threat.
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _frozen_mapping(items: Dict) -> MappingProxyType:
+    """Unpickle a frozen mapping"""
+    return MappingProxyType(items)
+
+
+# Frozen fragments travel to and from process-pool workers
+copyreg.pickle(MappingProxyType, lambda proxy: (_frozen_mapping, (dict(proxy),)))
+
+
+def _plain(value: Any) -> Any:
+    """Convert record fields back to plain JSON-shaped values"""
+    if isinstance(value, tuple):
+        return list(value)
+    if isinstance(value, (ThreatRecord, ThreatProperties, EnrichedThreat)):
+        return value.to_dict()
+    return value
+
+
+class ThreatProperties(Mapping):
+    """``custom_properties`` of a threat record"""
+    
+    __slots__ = ('severity', 'sectors', 'iocs', 'ttps', 'cve', 'fingerprint')
+    
+    def __init__(self, severity: str = 'medium', sectors: Iterable[str] = (),
+                 iocs: Dict[str, Any] = None, ttps: Iterable[str] = (),
+                 cve: Iterable[str] = (), fingerprint: str = None):
+        """Initialize properties, interning the enum-like fields"""
+        # Feeds may send null for any field, and a single CVE as a string
+        self.severity = sys.intern(severity or 'medium')
+        self.sectors = _shared(sectors or ())
+        self.iocs = iocs if iocs is not None else {}
+        self.ttps = _interned(ttps or ())
+        self.cve = (cve,) if isinstance(cve, str) else tuple(cve or ())
+        self.fingerprint = fingerprint
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__
+    
+    def __iter__(self):
+        return iter(self.__slots__)
+    
+    def __len__(self) -> int:
+        return len(self.__slots__)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the STIX ``custom_properties`` shape"""
+        return {key: _plain(getattr(self, key)) for key in self.__slots__}
+
+
+class ThreatRecord(Mapping):
+    """Read-only STIX 2.1 indicator with one slot per varying field
+    
+    Behaves as a mapping with exactly the keys (and key order) of the
+    normalized STIX dict, so analyzers read it like one. Constant fields
+    are shared class attributes and ``external_references`` is derived
+    from the source; ``to_dict`` gives the plain dict for I/O.
+    """
+    
+    __slots__ = ('id', 'created', 'modified', 'name', 'description', 'valid_from',
+                 'labels', 'confidence', 'source', 'custom_properties')
+    
+    type = 'indicator'
+    spec_version = '2.1'
+    pattern_type = 'stix'
+    object_marking_refs = ('marking-definition--tlp-amber',)
+    
+    KEYS = ('id', 'type', 'spec_version', 'created', 'modified', 'name', 'description',
+            'pattern_type', 'valid_from', 'labels', 'confidence', 'external_references',
+            'object_marking_refs', 'custom_properties')
+    _KEY_SET = frozenset(KEYS)
+    
+    def __init__(self, id: str, created: str, modified: str, name: str,
+                 description: str, valid_from: str, labels: Iterable[str],
+                 confidence: int, source: str, custom_properties: ThreatProperties):
+        """Initialize record"""
+        self.id = id
+        self.created = created
+        self.modified = modified
+        self.name = name
+        self.description = description
+        self.valid_from = valid_from
+        self.labels = _shared(labels or ())
+        self.confidence = confidence
+        self.source = sys.intern(source or 'unknown')
+        self.custom_properties = custom_properties
+    
+    @property
+    def external_references(self) -> list:
+        """STIX external references, derived from the source"""
+        return [{'source_name': self.source, 'description': self.description}]
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in self._KEY_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._KEY_SET else default
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._KEY_SET
+    
+    def __iter__(self):
+        return iter(self.KEYS)
+    
+    def __len__(self) -> int:
+        return len(self.KEYS)
+    
+    def __repr__(self) -> str:
+        return f"ThreatRecord({self.id!r}, {self.name!r})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the normalized STIX shape"""
+        return {key: _plain(getattr(self, key)) for key in self.KEYS}
+
+
+class EnrichedThreat(Mapping):
+    """A threat plus the results attached by analysis stages
+    
+    Reads fall through to the untouched base threat unless a stage set the
+    key, so enriching never copies the threat itself. Keys iterate in the
+    order ``{**threat, key: value}`` would give.
+    """
+    
+    __slots__ = ('base', 'overlays')
+    
+    def __init__(self, base: Mapping, overlays: Dict[str, Any]):
+        """Initialize overlay view"""
+        self.base = base
+        self.overlays = overlays
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in self.overlays:
+            return self.overlays[key]
+        return self.base[key]
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.overlays:
+            return self.overlays[key]
+        return self.base.get(key, default)
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self.overlays or key in self.base
+    
+    def __iter__(self):
+        yield from self.base
+        for key in self.overlays:
+            if key not in self.base:
+                yield key
+    
+    def __len__(self) -> int:
+        return len(self.base) + sum(1 for key in self.overlays if key not in self.base)
+    
+    def __repr__(self) -> str:
+        return f"EnrichedThreat({self.base!r}, {list(self.overlays)})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict of the base threat with the overlays applied"""
+        return {key: self[key] for key in self}
+
+
+def enrich(threat: Mapping, key: str, value: Any) -> EnrichedThreat:
+    """Attach ``value`` under ``key`` without copying ``threat``
+    
+    Equivalent to ``{**threat, key: value}`` for readers; repeated stages
+    share one base and only copy the small overlay dict.
+    """
+    if isinstance(threat, EnrichedThreat):
+        return EnrichedThreat(threat.base, {**threat.overlays, key: value})
+    return EnrichedThreat(threat, {key: value})
+
+
+def to_json(value: Any) -> Any:
+    """``json`` ``default`` hook that serializes records as their STIX dicts
+    
+    Frozen mappings from ``freeze`` are serialized as plain objects.
+    """
+    if isinstance(value, (ThreatRecord, ThreatProperties, EnrichedThreat)):
+        return value.to_dict()
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,324 @@
+"""
+Threat Storage
+SQLite storage backend for collected and analyzed threats
+"""
+
+import json
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+try:
+    from .threat_record import to_json
+    from .aggregates import ThreatAggregate, DEFAULT_SEVERITY, DEFAULT_THREAT_TYPE
+except ImportError:
+    from threat_record import to_json
+    from aggregates import ThreatAggregate, DEFAULT_SEVERITY, DEFAULT_THREAT_TYPE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ThreatStorage:
+    """Stores STIX threats in SQLite, keyed by STIX id
+    
+    Severity, priority, risk score, source, ``created`` and sectors are kept
+    in indexed columns so subsets can be queried without loading the full
+    corpus; the complete threat is stored as JSON.
+    """
+    
+    ORDER_COLUMNS = {
+        'risk_score': 'risk_score DESC',
+        'created': 'created DESC',
+        'modified': 'modified DESC'
+    }
+    
+    # Results the analyzers attach; kept when an unchanged threat is stored again without them
+    ANALYSIS_KEYS = ('analysis', 'financial_services_analysis', 'agriculture_analysis')
+    
+    def __init__(self, path: str = 'data/threats.db', retention_days: int = 365,
+                 batch_size: int = 500):
+        """Open (or create) the database at ``path``"""
+        self.path = path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+    
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['ThreatStorage']:
+        """Open the storage described by a config's ``storage`` section, if SQLite"""
+        storage_config = config.get('storage', {})
+        if storage_config.get('database') != 'sqlite':
+            return None
+        
+        return cls(
+            storage_config.get('path', 'data/threats.db'),
+            retention_days=storage_config.get('retention_days', 365)
+        )
+    
+    def _create_schema(self):
+        """Create tables and indexes"""
+        with self._lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS threats (
+                    id TEXT PRIMARY KEY,
+                    created TEXT,
+                    modified TEXT,
+                    severity TEXT,
+                    priority TEXT,
+                    risk_score REAL,
+                    source TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS threat_sectors (
+                    sector TEXT NOT NULL,
+                    threat_id TEXT NOT NULL,
+                    PRIMARY KEY (sector, threat_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_threats_severity ON threats (severity);
+                CREATE INDEX IF NOT EXISTS idx_threats_priority ON threats (priority, risk_score DESC);
+                CREATE INDEX IF NOT EXISTS idx_threats_risk_score ON threats (risk_score DESC);
+                CREATE INDEX IF NOT EXISTS idx_threats_created ON threats (created);
+                CREATE INDEX IF NOT EXISTS idx_threats_source ON threats (source);
+                CREATE INDEX IF NOT EXISTS idx_threat_sectors_threat ON threat_sectors (threat_id);
+            """)
+    
+    def upsert_many(self, threats: Iterable[Dict]) -> int:
+        """Insert or replace threats by STIX id in batched transactions
+        
+        A threat stored again without an analysis (as collected) and with
+        the same ``modified`` keeps the analysis, priority and risk score
+        already stored for it; a modified threat replaces them.
+        """
+        count = 0
+        batch = []
+        
+        for threat in threats:
+            batch.append(threat)
+            if len(batch) >= self.batch_size:
+                count += self._upsert_batch(batch)
+                batch = []
+        if batch:
+            count += self._upsert_batch(batch)
+        
+        logger.info(f"Stored {count} threats in {self.path}")
+        return count
+    
+    def _upsert_batch(self, threats: List[Dict]) -> int:
+        """Write one batch of threats in a single transaction"""
+        rows = []
+        sector_rows = []
+        
+        for threat in threats:
+            props = threat.get('custom_properties', {})
+            analysis = threat.get('analysis', {})
+            references = threat.get('external_references') or [{}]
+            rows.append((
+                threat['id'],
+                threat.get('created'),
+                threat.get('modified'),
+                props.get('severity'),
+                analysis.get('priority'),
+                analysis.get('risk_score'),
+                references[0].get('source_name'),
+                json.dumps(threat, default=to_json)
+            ))
+            sector_rows.extend((sector, threat['id']) for sector in props.get('sectors', []))
+        
+        with self._lock, self.conn:
+            self.conn.executemany(self._upsert_sql(), rows)
+            self.conn.executemany(
+                'DELETE FROM threat_sectors WHERE threat_id = ?',
+                [(row[0],) for row in rows]
+            )
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO threat_sectors (sector, threat_id) VALUES (?, ?)',
+                sector_rows
+            )
+        
+        return len(rows)
+    
+    def _upsert_sql(self) -> str:
+        """Upsert statement that keeps the stored analysis of unchanged, unanalyzed threats"""
+        keep = ("json_type(excluded.data, '$.analysis') IS NULL "
+                "AND excluded.modified IS threats.modified")
+        stored_analysis = ', '.join(
+            f"'{key}', json(json_extract(threats.data, '$.{key}'))" for key in self.ANALYSIS_KEYS
+        )
+        
+        return (
+            'INSERT INTO threats (id, created, modified, severity, priority, risk_score, source, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET created = excluded.created, '
+            'modified = excluded.modified, severity = excluded.severity, source = excluded.source, '
+            f'priority = CASE WHEN {keep} THEN COALESCE(excluded.priority, threats.priority) '
+            f'ELSE excluded.priority END, '
+            f'risk_score = CASE WHEN {keep} THEN COALESCE(excluded.risk_score, threats.risk_score) '
+            f'ELSE excluded.risk_score END, '
+            f'data = CASE WHEN {keep} THEN json_patch(excluded.data, json_object({stored_analysis})) '
+            f'ELSE excluded.data END'
+        )
+    
+    def _where(self, sector: str = None, severity: str = None, priority: str = None,
+               source: str = None, since: str = None) -> Tuple[str, List[Any]]:
+        """Build a WHERE clause for the common filters"""
+        clauses = []
+        params = []
+        
+        if sector:
+            clauses.append('id IN (SELECT threat_id FROM threat_sectors WHERE sector = ?)')
+            params.append(sector)
+        if severity:
+            clauses.append('severity = ?')
+            params.append(severity)
+        if priority:
+            clauses.append('priority = ?')
+            params.append(priority)
+        if source:
+            clauses.append('source = ?')
+            params.append(source)
+        if since:
+            clauses.append('created >= ?')
+            params.append(since)
+        
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+    
+    def iter_threats(self, sector: str = None, severity: str = None, priority: str = None,
+                     source: str = None, since: str = None, order_by: str = 'risk_score',
+                     limit: int = None, offset: int = 0) -> Iterator[Dict]:
+        """Yield stored threats matching the filters, one at a time"""
+        where, params = self._where(sector, severity, priority, source, since)
+        sql = f"SELECT data FROM threats{where} ORDER BY {self.ORDER_COLUMNS[order_by]}, id"
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [-1 if limit is None else limit, offset]
+        
+        # Each batch is fetched under the lock so other threads can interleave
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            for (data,) in rows:
+                yield json.loads(data)
+    
+    def query(self, **filters) -> List[Dict]:
+        """Return stored threats matching the filters (see ``iter_threats``)"""
+        return list(self.iter_threats(**filters))
+    
+    def get(self, threat_id: str) -> Optional[Dict]:
+        """Return one stored threat by STIX id"""
+        with self._lock:
+            row = self.conn.execute('SELECT data FROM threats WHERE id = ?', (threat_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def count(self, sector: str = None, severity: str = None, priority: str = None,
+              source: str = None, since: str = None) -> int:
+        """Count stored threats matching the filters"""
+        where, params = self._where(sector, severity, priority, source, since)
+        with self._lock:
+            return self.conn.execute(f'SELECT COUNT(*) FROM threats{where}', params).fetchone()[0]
+    
+    def data_version(self) -> Tuple[int, int]:
+        """Token that changes whenever the stored threats may have changed
+        
+        Combines SQLite's ``data_version``, which moves when another
+        connection or process commits, with this connection's own change
+        count. Cheap enough to check on every request.
+        """
+        with self._lock:
+            version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+            return version, self.conn.total_changes
+    
+    def summary(self) -> Dict[str, Any]:
+        """Return total count, priority distribution and average risk score"""
+        with self._lock:
+            total, avg_risk = self.conn.execute(
+                'SELECT COUNT(*), AVG(risk_score) FROM threats'
+            ).fetchone()
+            priorities = self.conn.execute(
+                'SELECT priority, COUNT(*) FROM threats WHERE priority IS NOT NULL GROUP BY priority'
+            ).fetchall()
+        
+        return {
+            'total_threats': total,
+            'average_risk_score': round(avg_risk or 0, 2),
+            'priority_distribution': dict(priorities)
+        }
+    
+    def aggregate(self, sector: str = None, severity: str = None, priority: str = None,
+                  source: str = None, since: str = None) -> ThreatAggregate:
+        """Aggregate stored threats matching the filters inside SQLite
+        
+        Counts, distributions and compliance totals are grouped by the
+        database, so no threat is loaded into Python. The result merges with
+        aggregates computed elsewhere.
+        """
+        where, params = self._where(sector, severity, priority, source, since)
+        matching = f'SELECT * FROM threats{where}'
+        aggregate = ThreatAggregate()
+        
+        with self._lock:
+            aggregate.total, aggregate.risk_total = self.conn.execute(
+                f'SELECT COUNT(*), COALESCE(SUM(risk_score), 0.0) FROM ({matching})', params
+            ).fetchone()
+            aggregate.priorities.update(dict(self.conn.execute(
+                f'SELECT priority, COUNT(*) FROM ({matching}) WHERE priority IS NOT NULL GROUP BY priority',
+                params
+            )))
+            aggregate.severities.update(dict(self.conn.execute(
+                f'SELECT COALESCE(severity, ?), COUNT(*) FROM ({matching}) GROUP BY 1',
+                [DEFAULT_SEVERITY, *params]
+            )))
+            aggregate.sectors.update(dict(self.conn.execute(
+                f'SELECT sector, COUNT(*) FROM threat_sectors '
+                f'WHERE threat_id IN (SELECT id FROM ({matching})) GROUP BY sector',
+                params
+            )))
+            aggregate.types.update(dict(self.conn.execute(
+                f"SELECT COALESCE(json_extract(data, '$.custom_properties.threat_type'), ?), "
+                f"COUNT(*) FROM ({matching}) GROUP BY 1",
+                [DEFAULT_THREAT_TYPE, *params]
+            )))
+            for framework, affected, reporting in self.conn.execute(
+                f"SELECT impact.key, COUNT(*), COALESCE(SUM(json_extract(impact.value, '$.reporting_required')), 0) "
+                f"FROM ({matching}) AS t, "
+                f"json_each(t.data, '$.financial_services_analysis.compliance_impact') AS impact "
+                f"GROUP BY impact.key",
+                params
+            ):
+                aggregate.compliance[framework] = [affected, reporting]
+        
+        return aggregate
+    
+    def prune(self) -> int:
+        """Delete threats created more than ``retention_days`` ago"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        
+        with self._lock, self.conn:
+            self.conn.execute(
+                'DELETE FROM threat_sectors WHERE threat_id IN '
+                '(SELECT id FROM threats WHERE created < ?)',
+                (cutoff,)
+            )
+            pruned = self.conn.execute('DELETE FROM threats WHERE created < ?', (cutoff,)).rowcount
+        
+        if pruned:
+            logger.info(f"Pruned {pruned} threats older than {self.retention_days} days")
+        return pruned
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self.conn.close()
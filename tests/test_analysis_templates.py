@@ -0,0 +1,56 @@
+"""
+Classification and recommendations shared through the template cache
+"""
+
+import json
+import os
+import pickle
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.threat_analyzer import ThreatAnalyzer
+from src.threat_record import to_json
+
+
+def _threat(threat_id):
+    return {'id': threat_id, 'created': '2026-10-01T00:00:00',
+            'custom_properties': {'severity': 'high', 'threat_type': 'malware', 'ttps': ['T1486']}}
+
+
+@pytest.fixture
+def analyzed():
+    analyzer = ThreatAnalyzer()
+    return list(analyzer.iter_analyze([_threat('indicator--a'), _threat('indicator--b')], 'financial_services'))
+
+
+def test_threats_with_one_signature_share_their_templates(analyzed):
+    first, second = analyzed
+    assert first['analysis']['classification'] is second['analysis']['classification']
+
+
+def test_mutating_one_result_leaves_the_other_intact(analyzed):
+    first, second = analyzed
+    classification = first['analysis']['classification']
+    expected = dict(second['analysis']['classification'])
+    
+    with pytest.raises(TypeError):
+        classification['category'] = 'tampered'
+    with pytest.raises(AttributeError):
+        classification['attack_vectors'].append('tampered')
+    with pytest.raises(AttributeError):
+        first['analysis']['recommendations'].append('tampered')
+    
+    # Replacing the per-threat analysis fields does not reach the shared templates
+    first['analysis']['classification'] = {'category': 'tampered'}
+    assert dict(second['analysis']['classification']) == expected
+
+
+def test_frozen_templates_serialize_and_pickle(analyzed):
+    analysis = analyzed[0]['analysis']
+    
+    decoded = json.loads(json.dumps(analysis, default=to_json))
+    assert decoded['classification']['category'] == analysis['classification']['category']
+    assert pickle.loads(pickle.dumps(analysis))['classification'] == analysis['classification']
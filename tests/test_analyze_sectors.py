@@ -0,0 +1,61 @@
+"""
+Single-pass multi-sector analysis
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.threat_analyzer import ThreatAnalyzer
+
+SECTORS = ['financial_services', 'agriculture']
+
+
+def _threats():
+    return [
+        {'id': f'indicator--{i}', 'created': '2026-10-01T00:00:00', 'confidence': confidence,
+         'description': 'Ransomware campaign against credit unions',
+         'custom_properties': {'severity': severity, 'threat_type': 'malware',
+                               'sectors': ['financial_services'], 'ttps': ['T1486'],
+                               'iocs': {'ip_addresses': ['192.0.2.1'] * 6}}}
+        for i, (severity, confidence) in enumerate(
+            [('critical', 95), ('high', 90), ('low', 40), ('medium', 60)] * 10
+        )
+    ]
+
+
+def test_listeners_receive_alert_priorities():
+    analyzer = ThreatAnalyzer()
+    alerted = []
+    analyzer.add_listener(alerted.append)
+    
+    analyzed = analyzer.analyze_sectors(_threats(), SECTORS)
+    
+    expected = [t['id'] for t in analyzed.unordered() if t['analysis']['priority'] in ('critical', 'high')]
+    assert expected
+    assert [t['id'] for t in alerted] == expected
+
+
+def test_workers_match_serial_path():
+    analyzer = ThreatAnalyzer()
+    serial = analyzer.analyze_sectors(_threats(), SECTORS)
+    parallel = analyzer.analyze_sectors(_threats(), SECTORS, workers=2)
+    
+    def strip(threat):
+        analysis = dict(threat['analysis'])
+        analysis.pop('analyzed_at')
+        analysis['sectors'] = {
+            sector: {k: v for k, v in result.items() if k != 'analyzed_at'}
+            for sector, result in analysis['sectors'].items()
+        }
+        return threat['id'], analysis
+    
+    assert [strip(t) for t in parallel] == [strip(t) for t in serial]
+
+
+def test_incremental_is_rejected():
+    with pytest.raises(ValueError):
+        ThreatAnalyzer().analyze_sectors(_threats(), SECTORS, incremental=True)
@@ -0,0 +1,47 @@
+"""
+Near-duplicate clustering with MinHash/LSH
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.threat_clustering import MinHashLSH, ThreatClusterer
+
+THRESHOLD = 0.45
+
+
+def _threat(threat_id, first_ip, count=100, confidence=50):
+    ips = [f"10.0.{n // 256}.{n % 256}" for n in range(first_ip, first_ip + count)]
+    return {'id': threat_id, 'name': '', 'confidence': confidence,
+            'custom_properties': {'iocs': {'ip_addresses': ips}}}
+
+
+def test_chain_joins_through_a_non_representative_member():
+    # B overlaps A and C; A and C overlap too little to match directly
+    a = _threat('indicator--a', 48000, confidence=90)
+    b = _threat('indicator--b', 48030)
+    c = _threat('indicator--c', 48060)
+    
+    clusterer = ThreatClusterer(threshold=THRESHOLD)
+    lsh = MinHashLSH(clusterer.num_perm, clusterer.bands)
+    sig_a, sig_b, sig_c = (lsh.signature(clusterer._tokens(t)) for t in (a, b, c))
+    assert MinHashLSH.similarity(sig_a, sig_b) >= THRESHOLD
+    assert MinHashLSH.similarity(sig_b, sig_c) >= THRESHOLD
+    assert MinHashLSH.similarity(sig_a, sig_c) < THRESHOLD
+    
+    clustered = clusterer.cluster([a, b, c])
+    
+    assert len(clustered) == 1
+    assert clustered[0]['id'] == 'indicator--a'
+    assert clustered[0]['custom_properties']['merged_ids'] == ['indicator--b', 'indicator--c']
+
+
+def test_identical_flood_collapses_to_one_threat():
+    threats = [_threat(f'indicator--{i}', 0, count=5) for i in range(500)]
+    threats.append(_threat('indicator--other', 9000, count=5))
+    
+    clustered = ThreatClusterer(threshold=THRESHOLD).cluster(threats)
+    
+    assert [t['id'] for t in clustered] == ['indicator--0', 'indicator--other']
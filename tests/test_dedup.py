@@ -0,0 +1,55 @@
+"""
+Cross-run deduplication by fingerprint
+"""
+
+import os
+import sys
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.threat_collector import ThreatCollector
+
+
+def _threats():
+    return [{'id': f'indicator--{n}', 'custom_properties': {'fingerprint': f'fp-{n}'}}
+            for n in range(3)]
+
+
+@pytest.fixture
+def collector(tmp_path):
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'collection': {'state_path': str(tmp_path / 'state.json')},
+        'storage': {'dedup_index': str(tmp_path / 'dedup_index.db')},
+    }))
+    collector = ThreatCollector(str(config_path))
+    yield collector
+    collector.dedup_index.close()
+
+
+def test_unsaved_threats_are_collected_again(collector):
+    assert len(list(collector.iter_dedup(_threats()))) == 3
+    assert len(collector.dedup_index) == 0
+    
+    assert len(list(collector.iter_dedup(_threats()))) == 3
+
+
+def test_saved_threats_are_skipped_next_run(collector, tmp_path):
+    collector.save_threats(str(tmp_path / 'threats.json'), collector.iter_dedup(_threats()))
+    assert len(collector.dedup_index) == 3
+    
+    assert list(collector.iter_dedup(_threats())) == []
+    assert len(list(collector.iter_dedup(_threats(), full_resync=True))) == 3
+
+
+def test_failed_save_records_nothing(collector, tmp_path):
+    def failing():
+        yield from collector.iter_dedup(_threats())
+        raise OSError("disk full")
+    
+    with pytest.raises(OSError):
+        collector.save_threats(str(tmp_path / 'threats.json'), failing())
+    assert len(collector.dedup_index) == 0
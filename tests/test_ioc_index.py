@@ -0,0 +1,38 @@
+"""
+IOC lookup index
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ioc_index import IOCIndex
+
+
+def _index():
+    return IOCIndex.build([
+        {'id': 'indicator--parent', 'custom_properties': {'iocs': {'domains': ['evil.example']}}},
+        {'id': 'indicator--exact', 'custom_properties': {'iocs': {'urls': ['login.evil.example']}}},
+        {'id': 'indicator--net', 'custom_properties': {'iocs': {'ip_addresses': ['10.1.0.0/16']}}}
+    ])
+
+
+def test_domain_matches_exact_iocs_and_parent_domains():
+    assert _index().match('login.evil.example') == ['indicator--exact', 'indicator--parent']
+
+
+def test_match_many_returns_only_hits_once_per_observable():
+    observables = ['login.evil.example', 'benign.test', '10.1.2.3', 'login.evil.example']
+    
+    assert _index().match_many(observables) == {
+        'login.evil.example': ['indicator--exact', 'indicator--parent'],
+        '10.1.2.3': ['indicator--net']
+    }
+
+
+def test_leading_zero_octets_are_not_addresses():
+    index = _index()
+    
+    assert index.match('010.1.2.3') == []
+    assert index.detect_type('010.1.2.3') != 'ip_addresses'
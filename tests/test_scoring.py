@@ -0,0 +1,89 @@
+"""
+Parity of the vectorized batch scorer with the per-threat scoring path
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import threat_analyzer
+from src.threat_analyzer import ThreatAnalyzer
+
+
+def _ago(**kwargs) -> datetime:
+    """A time safely inside a recency bucket (an hour clear of its edge)"""
+    return datetime.now() - timedelta(**kwargs) + timedelta(hours=1)
+
+
+def _threat(severity='medium', confidence=None, created=None, iocs=None,
+            sectors=(), ttps=(), description=''):
+    threat = {'id': f'indicator--{severity}-{created}', 'description': description,
+              'custom_properties': {'severity': severity, 'sectors': list(sectors),
+                                    'ttps': list(ttps), 'iocs': iocs or {}}}
+    if confidence is not None:
+        threat['confidence'] = confidence
+    if created is not None:
+        threat['created'] = created
+    return threat
+
+
+MIXED_THREATS = [
+    _threat('critical', 95, _ago(hours=2).isoformat(), {'ip': ['1.2.3.4'] * 12},
+            sectors=['financial_services'], ttps=['T1566.001'], description='Phishing for SWIFT credentials'),
+    _threat('high', 90, _ago(days=5).isoformat(), {'domain': ['a.example', 'b.example'], 'sha256': 'abc'},
+            sectors=['agriculture'], ttps=['T1190'], description='Ransomware hits farm sensor networks'),
+    _threat('low', 70, _ago(days=20).isoformat(), {'ip': ['10.0.0.1'] * 5}),
+    _threat('medium', 60, _ago(days=60).isoformat(), {'url': ['http://x'] * 3}),
+    _threat('unknown', 40, _ago(days=400).isoformat()),
+]
+
+EDGE_CASE_THREATS = [
+    # Missing fields fall back to the defaults
+    {},
+    {'custom_properties': {}},
+    _threat(created=None),
+    _threat(confidence=None, created=_ago(days=3).isoformat()),
+    # Unparseable or non-string timestamps score as unknown recency
+    _threat(created='not a date'),
+    _threat(created=''),
+    # Timezone-aware timestamps, in UTC and with an offset
+    _threat('high', 80, (datetime.now(timezone.utc) - timedelta(days=2)).strftime('%Y-%m-%dT%H:%M:%SZ')),
+    _threat('high', 80, (datetime.now(timezone(timedelta(hours=9))) - timedelta(days=10)).isoformat()),
+    _threat('critical', 95, (datetime.now(timezone(timedelta(hours=-5))) - timedelta(hours=3)).isoformat()),
+    # Created in the future
+    _threat('medium', 60, (datetime.now() + timedelta(days=3)).isoformat()),
+    # A single IOC given as a scalar rather than a list
+    _threat('low', 50, _ago(days=1).isoformat(), {'ip': '192.0.2.1'}),
+]
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return ThreatAnalyzer()
+
+
+@pytest.mark.parametrize('sector', [None, 'financial_services', 'agriculture'])
+@pytest.mark.parametrize('threats', [MIXED_THREATS, EDGE_CASE_THREATS, MIXED_THREATS + EDGE_CASE_THREATS],
+                         ids=['mixed', 'edge_cases', 'combined'])
+def test_batch_scores_match_scalar_path(analyzer, threats, sector):
+    risk_scores, priorities, relevances = analyzer._score_batch(threats, sector)
+    
+    assert risk_scores == [analyzer._calculate_risk_score(t, sector) for t in threats]
+    assert priorities == [analyzer._get_priority(score) for score in risk_scores]
+    assert relevances == [analyzer._calculate_sector_relevance(t, sector) for t in threats]
+
+
+def test_empty_batch(analyzer):
+    assert analyzer._score_batch([], 'financial_services') == ([], [], [])
+
+
+def test_fallback_without_numpy_matches(analyzer, monkeypatch):
+    threats = MIXED_THREATS + EDGE_CASE_THREATS
+    vectorized = analyzer._score_batch(threats, 'financial_services')
+    
+    monkeypatch.setattr(threat_analyzer, 'np', None)
+    assert analyzer._score_batch(threats, 'financial_services') == vectorized
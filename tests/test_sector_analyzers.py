@@ -0,0 +1,49 @@
+"""
+Shared analysis fragments of the sector analyzers
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.sector_analyzers import AgricultureAnalyzer, FinancialServicesAnalyzer
+from src.threat_record import to_json
+
+
+def _threat(threat_id, sectors):
+    return {'id': threat_id, 'description': 'Ransomware on IoT sensors',
+            'custom_properties': {'severity': 'critical', 'threat_type': 'malware', 'sectors': sectors},
+            'analysis': {'risk_score': 80}}
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_financial_services_fragments_are_frozen(workers):
+    threats = [_threat('indicator--a', ['financial_services']), _threat('indicator--b', ['financial_services'])]
+    first, second = FinancialServicesAnalyzer().analyze_threats(threats, workers=workers).unordered()
+    analysis = first['financial_services_analysis']
+    expected = json.loads(json.dumps(second['financial_services_analysis'], default=to_json))
+    
+    with pytest.raises(TypeError):
+        analysis['business_impact']['operational'] = 'none'
+    with pytest.raises(TypeError):
+        analysis['regulatory_reporting']['required'] = False
+    with pytest.raises(AttributeError):
+        analysis['compliance_impact']['FFIEC']['controls_to_review'].append('tampered')
+    
+    assert json.loads(json.dumps(second['financial_services_analysis'], default=to_json)) == expected
+    assert expected['compliance_impact']['FFIEC']['controls_to_review'] == [
+        'access_control', 'data_protection', 'incident_response'
+    ]
+
+
+def test_agriculture_fragments_are_frozen():
+    threats = [_threat('indicator--a', ['agriculture'])]
+    analysis = AgricultureAnalyzer().analyze_threats(threats)[0]['agriculture_analysis']
+    
+    with pytest.raises(TypeError):
+        analysis['rural_considerations']['limited_connectivity'] = False
+    assert json.loads(json.dumps(analysis, default=to_json))['rural_considerations']['limited_connectivity'] is True
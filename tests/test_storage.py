@@ -0,0 +1,74 @@
+"""
+SQLite threat storage
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.aggregates import ThreatAggregate
+from src.threat_storage import ThreatStorage
+
+
+def _collected(modified='2026-10-01T00:00:00'):
+    return {'id': 'indicator--a', 'created': '2099-01-01T00:00:00', 'modified': modified,
+            'name': 'Wire fraud kit', 'custom_properties': {'severity': 'high', 'sectors': ['financial_services']}}
+
+
+def _analyzed(modified='2026-10-01T00:00:00'):
+    return {**_collected(modified),
+            'analysis': {'risk_score': 82.5, 'priority': 'critical'},
+            'financial_services_analysis': {'mitigation_priority': 99}}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = ThreatStorage(str(tmp_path / 'threats.db'))
+    yield storage
+    storage.close()
+
+
+def test_recollected_threat_keeps_its_analysis(storage):
+    storage.upsert_many([_analyzed()])
+    storage.upsert_many([{**_collected(), 'name': 'Wire fraud kit v2'}])
+    
+    stored = storage.get('indicator--a')
+    assert stored['name'] == 'Wire fraud kit v2'
+    assert stored['analysis'] == {'risk_score': 82.5, 'priority': 'critical'}
+    assert stored['financial_services_analysis'] == {'mitigation_priority': 99}
+    assert storage.count(priority='critical') == 1
+    assert storage.summary()['average_risk_score'] == 82.5
+
+
+def test_modified_threat_drops_its_stale_analysis(storage):
+    storage.upsert_many([_analyzed()])
+    storage.upsert_many([_collected(modified='2026-10-02T00:00:00')])
+    
+    assert 'analysis' not in storage.get('indicator--a')
+    assert storage.count(priority='critical') == 0
+
+
+def test_new_analysis_replaces_the_stored_one(storage):
+    storage.upsert_many([_analyzed()])
+    reanalyzed = {**_collected(), 'analysis': {'risk_score': 40.0, 'priority': 'medium'}}
+    storage.upsert_many([reanalyzed])
+    
+    stored = storage.get('indicator--a')
+    assert stored['analysis']['priority'] == 'medium'
+    assert 'financial_services_analysis' not in stored
+    assert storage.count(priority='medium') == 1
+
+
+def test_aggregate_matches_in_memory_for_missing_fields(storage):
+    threats = [_analyzed(),
+               {**_collected(), 'id': 'indicator--b', 'custom_properties': {'severity': None, 'threat_type': None}},
+               {**_collected(), 'id': 'indicator--c', 'custom_properties': {}}]
+    storage.upsert_many(threats)
+    
+    stored = storage.aggregate()
+    in_memory = ThreatAggregate.from_threats(threats)
+    assert stored.severities == in_memory.severities == {'high': 1, 'medium': 2}
+    assert stored.types == in_memory.types == {'unknown': 3}
@@ -0,0 +1,132 @@
+"""
+Collection from a TAXII 2.1 feed served by a local stub server
+"""
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.threat_collector import AsyncThreatCollector, TAXII_MEDIA_TYPE
+
+INDICATOR = {
+    'type': 'indicator',
+    'spec_version': '2.1',
+    'id': 'indicator--8e2e2d2b-17d4-4cbf-938f-98ee46b3cd3f',
+    'created': '2026-10-01T08:00:00.000Z',
+    'modified': '2026-10-02T09:30:00.000Z',
+    'valid_from': '2026-10-01T08:00:00Z',
+    'name': 'SWIFT credential phishing infrastructure',
+    'description': 'Phishing kit hosts targeting bank operators',
+    'indicator_types': ['malicious-activity'],
+    'labels': ['high'],
+    'pattern': "[ipv4-addr:value = '198.51.100.7' OR domain-name:value = 'swift-login.example'] "
+               "AND [file:hashes.'SHA-256' = 'aabbccdd']",
+    'pattern_type': 'stix',
+    'external_references': [
+        {'source_name': 'mitre-attack', 'external_id': 'T1566.001'},
+        {'source_name': 'cve', 'external_id': 'CVE-2026-1234'}
+    ]
+}
+
+PAGES = {
+    None: {
+        'more': True,
+        'next': 'page-2',
+        'objects': [
+            INDICATOR,
+            {'type': 'identity', 'spec_version': '2.1', 'id': 'identity--5b1f3a4e-6c0d-4f7e-9a8b-1c2d3e4f5a6b',
+             'name': 'Example ISAC', 'identity_class': 'organization'}
+        ]
+    },
+    'page-2': {
+        'more': False,
+        'objects': [
+            {'type': 'relationship', 'spec_version': '2.1', 'id': 'relationship--0c7b5b88-8ff7-4a4d-aa9c-feb398cd0061',
+             'relationship_type': 'indicates', 'source_ref': INDICATOR['id'],
+             'target_ref': 'malware--31b940d4-6f7f-459a-80ea-9c1f17b5891b'}
+        ]
+    }
+}
+
+
+class StubTaxiiHandler(BaseHTTPRequestHandler):
+    requests = []
+    
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        self.requests.append({'accept': self.headers.get('Accept'), 'query': query})
+        
+        body = json.dumps(PAGES[query.get('next', [None])[0]]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', TAXII_MEDIA_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def taxii_url():
+    StubTaxiiHandler.requests = []
+    server = HTTPServer(('127.0.0.1', 0), StubTaxiiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/taxii2/collections/demo/objects/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def collector(tmp_path, taxii_url):
+    config = {
+        'threat_feeds': {'fs_isac': {'enabled': True, 'endpoint': taxii_url}},
+        'collection': {'state_path': str(tmp_path / 'state.json'), 'lookback_days': 7}
+    }
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump(config))
+    
+    with AsyncThreatCollector(str(config_path)) as collector:
+        yield collector
+
+
+def test_requests_use_taxii_media_type_and_rfc3339_cursor(collector):
+    collector.collect_all()
+    
+    assert len(StubTaxiiHandler.requests) == 2
+    assert all(request['accept'] == TAXII_MEDIA_TYPE for request in StubTaxiiHandler.requests)
+    added_after = StubTaxiiHandler.requests[0]['query']['added_after'][0]
+    assert added_after.endswith('Z') and 'T' in added_after
+    assert StubTaxiiHandler.requests[1]['query']['next'] == ['page-2']
+
+
+def test_stix_indicator_is_mapped(collector):
+    threats = collector.collect_all()
+    
+    # The identity and relationship objects are not threats
+    assert len(threats) == 1
+    threat = threats[0]
+    assert threat['name'] == INDICATOR['name']
+    assert threat['external_references'][0]['source_name'] == 'FS_ISAC'
+    assert threat['created'] == INDICATOR['valid_from']
+    assert threat['modified'] == INDICATOR['modified']
+    assert list(threat['labels']) == ['malicious-activity']
+    
+    props = threat['custom_properties']
+    assert props['severity'] == 'high'
+    assert props['iocs'] == {
+        'ip_addresses': ['198.51.100.7'],
+        'domains': ['swift-login.example'],
+        'file_hashes': ['aabbccdd']
+    }
+    assert list(props['ttps']) == ['T1566.001']
+    assert list(props['cve']) == ['CVE-2026-1234']